@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.local_server import start_server
+from scraper_core.async_download import AsyncDownloader, DownloadJob, aiohttp
+from scraper_core.resumable import range_headers
+from scraper_core.sinks import LocalSink, download_to_sink
+from scraper_core.transport import build_session
+
+# -----------------------------------------------------------------------------
+# CPU time per GB of the download write path: the old per-chunk copy
+# (iter_content + write per chunk, 8 KiB as Frameset used and 32 KiB as Flim
+# used; iter_chunked on the async engine) vs the block path in
+# scraper_core/blockio.py (body read into a pooled buffer, written in aligned
+# blocks). The server runs in a child process, so only the client's CPU is
+# counted. Files are fetched one after another and every byte is checked.
+# Usage: python benchmarks/bench_blockio.py --files 8 --size 134217728
+# -----------------------------------------------------------------------------
+
+MIB = 1024 * 1024
+
+
+def serve(conn):
+    server, url = start_server()
+    conn.send(url)
+    conn.recv()
+    server.shutdown()
+
+
+def verify(path, size):
+    expected = bytes(range(256)) * (MIB // 256)
+    with open(path, "rb") as f:
+        offset = 0
+        while chunk := f.read(MIB):
+            if chunk != expected[:len(chunk)]:
+                raise AssertionError(f"{path}: wrong bytes near offset {offset}")
+            offset += len(chunk)
+    if offset != size:
+        raise AssertionError(f"{path}: {offset}/{size} bytes")
+
+
+def per_chunk(chunk_size):
+    # download_to_sink's copy loop before the block path
+    def run(session, urls, folder):
+        sink = LocalSink(folder)
+        for i, url in enumerate(urls):
+            writer = sink.open(f"{i}.mp4")
+            with session.get(url, headers=range_headers(0), stream=True, timeout=30) as response:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    writer.write(chunk)
+            writer.commit()
+    return run
+
+
+def blocks(block_size):
+    def run(session, urls, folder):
+        sink = LocalSink(folder)
+        for i, url in enumerate(urls):
+            download_to_sink(session, url, sink, f"{i}.mp4", block_size=block_size)
+    return run
+
+
+def async_per_chunk(chunk_size):
+    # The async engine's copy loop before the block path
+    async def fetch_all(urls, folder):
+        async with aiohttp.ClientSession() as client:
+            for i, url in enumerate(urls):
+                async with client.get(url, headers=range_headers(0)) as response:
+                    with open(folder / f"{i}.mp4", "wb") as f:
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            f.write(chunk)
+
+    def run(session, urls, folder):
+        asyncio.run(fetch_all(urls, folder))
+    return run
+
+
+def async_blocks(block_size):
+    def run(session, urls, folder):
+        jobs = [DownloadJob(url, folder / f"{i}.mp4", i + 1, len(urls)) for i, url in enumerate(urls)]
+        AsyncDownloader(max_in_flight=1, per_host_limit=1, block_size=block_size).run(jobs)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size", type=int, default=128 * MIB)
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[256 * 1024, MIB])
+    args = parser.parse_args()
+
+    runs = [("per chunk 8K", per_chunk(8192)), ("per chunk 32K", per_chunk(32 * 1024))]
+    runs += [(f"blocks {b // 1024}K", blocks(b)) for b in args.block_sizes]
+    if aiohttp is not None:
+        runs.append(("async per chunk 32K", async_per_chunk(32 * 1024)))
+        runs += [(f"async blocks {b // 1024}K", async_blocks(b)) for b in args.block_sizes]
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child,), daemon=True)
+    server.start()
+    base_url = parent.recv()
+    urls = [f"{base_url}/asset/{i}?size={args.size}" for i in range(args.files)]
+    session = build_session(pool_size=2)
+    total_gb = args.files * args.size / 1e9
+
+    print(f"{args.files} files x {args.size // MIB} MiB over loopback")
+    print(f"{'mode':<22} {'seconds':>8} {'MB/s':>8} {'CPU s/GB':>9}")
+    try:
+        for label, run in runs:
+            folder = Path(tempfile.mkdtemp(prefix="bench_blockio_"))
+            try:
+                wall = time.perf_counter()
+                cpu = time.process_time()
+                run(session, urls, folder)
+                wall = time.perf_counter() - wall
+                cpu = time.process_time() - cpu
+                for i in range(args.files):
+                    verify(folder / f"{i}.mp4", args.size)
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+            print(f"{label:<22} {wall:>8.2f} {total_gb * 1000 / wall:>8.1f} {cpu / total_gb:>9.2f}")
+    finally:
+        parent.send("stop")
+        server.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
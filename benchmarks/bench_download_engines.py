@@ -0,0 +1,76 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.local_server import start_server
+from scraper_core.async_download import AsyncDownloader, DownloadJob
+
+# -----------------------------------------------------------------------------
+# Thread pool vs asyncio download engine against a local HTTP stand-in.
+# Usage: python benchmarks/bench_download_engines.py --files 2000 --size 262144
+# -----------------------------------------------------------------------------
+
+
+def run_threads(urls, out_dir, workers):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+
+    def download(url, filepath):
+        if filepath.exists():
+            return
+        response = session.get(url, timeout=30, stream=True)
+        if response.status_code == 200:
+            with open(filepath, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=32*1024):
+                    f.write(chunk)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(download, url, out_dir / f"{i}.mp4") for i, url in enumerate(urls)]
+        for future in as_completed(futures):
+            future.result()
+
+
+def run_async(urls, out_dir, workers):
+    jobs = [DownloadJob(url, out_dir / f"{i}.mp4", i+1, len(urls)) for i, url in enumerate(urls)]
+    AsyncDownloader(max_in_flight=workers, per_host_limit=workers).run(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=256 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05, help="per-request server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[48, 200, 500])
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+    urls = [f"{base_url}/asset/{i}?size={args.size}" for i in range(args.files)]
+    total_mb = args.files * args.size / (1024 * 1024)
+
+    print(f"{'engine':<8} {'conc':>5} {'seconds':>8} {'files/s':>9} {'MB/s':>8}")
+    try:
+        for concurrency in args.concurrency:
+            for name, runner in (("threads", run_threads), ("async", run_async)):
+                out_dir = Path(tempfile.mkdtemp(prefix="bench_dl_"))
+                try:
+                    start = time.perf_counter()
+                    runner(urls, out_dir, concurrency)
+                    elapsed = time.perf_counter() - start
+                finally:
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                print(f"{name:<8} {concurrency:>5} {elapsed:>8.2f} {args.files / elapsed:>9.1f} {total_mb / elapsed:>8.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.local_server import make_self_signed_cert, start_server
+from scraper_core.rate_control import RateController
+from scraper_core.transport import Http2Session, httpx
+
+# -----------------------------------------------------------------------------
+# Frameset CDN transport: fresh connection per request (module-level
+# requests.get, the old behaviour) vs a pooled Session vs the HTTP/2 client,
+# against a local TLS stand-in. Reports shots/second; the README's live figure
+# for the old transport is ~4.5 shots/s. The stdlib stand-in only speaks
+# HTTP/1.1, so the http2 row measures httpx's pooled fallback; point it at an
+# h2-capable server to see multiplexing.
+# Usage: python benchmarks/bench_frameset_transport.py --shots 400 --workers 8
+# -----------------------------------------------------------------------------
+
+README_SHOTS_PER_SECOND = 4.5
+
+
+def fetch_all(get, urls, workers):
+    def fetch(url):
+        with get(url) as response:
+            for _ in response.iter_content(chunk_size=8192):
+                pass
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fetch, urls))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shots", type=int, default=400)
+    parser.add_argument("--size", type=int, default=300 * 1024)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    certfile = make_self_signed_cert(tempfile.mkdtemp(prefix="bench_tls_"))
+    server, base_url = start_server(latency=args.latency, certfile=certfile)
+    base_url = base_url.replace("127.0.0.1", "localhost")
+    urls = [f"{base_url}/shot/{i}?size={args.size}" for i in range(args.shots)]
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=args.workers))
+
+    transports = [
+        ("fresh", lambda url: requests.get(url, stream=True, timeout=30, verify=str(certfile))),
+        ("pooled", lambda url: session.get(url, stream=True, timeout=30, verify=str(certfile))),
+    ]
+    if httpx is not None:
+        # Unlimited controller so only the transport is measured
+        controller = RateController({"localhost": {"initial_limit": 10_000, "max_limit": 10_000}})
+        h2 = Http2Session(max_connections=4, controller=controller, verify=str(certfile))
+        transports.append(("http2", lambda url: h2.get(url, stream=True, timeout=30)))
+    else:
+        print("httpx[http2] not installed; skipping the http2 transport")
+
+    print(f"{'transport':<10} {'seconds':>8} {'shots/s':>9} {'vs README':>10}")
+    try:
+        for name, get in transports:
+            start = time.perf_counter()
+            fetch_all(get, urls, args.workers)
+            elapsed = time.perf_counter() - start
+            rate = args.shots / elapsed
+            print(f"{name:<10} {elapsed:>8.2f} {rate:>9.1f} {rate / README_SHOTS_PER_SECOND:>9.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import id_processor
+from id_processor import get_s3_paths
+
+# -----------------------------------------------------------------------------
+# S3 path computation for N ids: the scalar get_s3_path in a loop (cache
+# cleared, as on a first pass) vs the batch get_s3_paths, single-process and
+# across processes, plus a repeated-lookup pass that hits the LRU cache.
+# Batch output is checked against the scalar output.
+# Usage: python benchmarks/bench_id_processor.py --sizes 1000000 10000000 --processes 4
+# -----------------------------------------------------------------------------
+
+
+def make_ids(count):
+    # Mix of 20-char flim ids and 36-char UUID-style ids
+    return [f"{i:020d}" if i % 2 else f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--repeat-ids", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'ids':>10} {'method':<22} {'seconds':>8} {'ids/s':>12}")
+    for size in args.sizes:
+        ids = make_ids(size)
+
+        def scalar():
+            id_processor.get_global_uuid.cache_clear()
+            return [id_processor.get_s3_path(i, "videos", "mp4") for i in ids]
+
+        runs = [
+            ("scalar", scalar),
+            ("batch", lambda: get_s3_paths(ids, "videos", "mp4")),
+            (f"batch x{args.processes} procs", lambda: get_s3_paths(ids, "videos", "mp4", processes=args.processes)),
+        ]
+        expected = None
+        for name, func in runs:
+            elapsed, paths = timed(func)
+            if expected is None:
+                expected = paths
+            elif paths != expected:
+                raise SystemExit(f"{name} output differs from scalar get_s3_path")
+            print(f"{size:>10} {name:<22} {elapsed:>8.2f} {size / elapsed:>12,.0f}")
+        del expected, paths
+
+    # Repeated lookups of a small working set go through the LRU cache
+    hot = make_ids(args.repeat_ids)
+    id_processor.get_global_uuid.cache_clear()
+    lookups = args.repeat_ids * 100
+    elapsed, _ = timed(lambda: [id_processor.get_s3_path(hot[i % len(hot)], "videos", "mp4") for i in range(lookups)])
+    print(f"{lookups:>10} {'scalar, LRU hits':<22} {elapsed:>8.2f} {lookups / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scraper_core.metadata_store import MetadataStore
+
+# -----------------------------------------------------------------------------
+# Legacy _metadata.json (full load + full rewrite) vs the append-only JSONL store.
+# Each run loads N existing items and saves one run's worth of new items.
+# Usage: python benchmarks/bench_metadata_store.py --sizes 10000 100000 1000000
+# -----------------------------------------------------------------------------
+
+
+def make_item(i):
+    return {
+        "id": f"{i:020d}",
+        "has_video_urls": i % 3 == 0,
+        "full_resolution_url": f"https://cdn.example.com/stills/{i}.jpg",
+        "video_urls": {"url_full": f"https://cdn.example.com/videos/{i}.mp4"},
+        "movie": {"title": f"Movie {i % 5000}", "year": 1950 + i % 75},
+        "shot_type": "CLOSE_UP",
+        "colors": ["#112233", "#445566", "#778899"],
+    }
+
+
+def bench_legacy(folder, existing, new_items):
+    path = folder / "_metadata.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(existing, f, indent=2, ensure_ascii=False)
+
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    existing_ids = {item.get("id") for item in data}
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    final_list = data.copy()
+    final_list.extend(item for item in new_items if item["id"] not in existing_ids)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(final_list, f, indent=2, ensure_ascii=False)
+    save_time = time.perf_counter() - start
+    return load_time, save_time
+
+
+def bench_jsonl(folder, existing, new_items):
+    MetadataStore(folder).append(existing)
+
+    start = time.perf_counter()
+    store = MetadataStore(folder)
+    existing_ids = store.load_ids()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # The scrapers append once per metadata page
+    fresh = [item for item in new_items if item["id"] not in existing_ids]
+    for i in range(0, len(fresh), 200):
+        store.append(fresh[i:i + 200])
+    save_time = time.perf_counter() - start
+    return load_time, save_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--new", type=int, default=10_000, help="new items saved per run")
+    args = parser.parse_args()
+
+    print(f"{'store':<8} {'items':>9} {'load s':>8} {'save s':>8}")
+    for size in args.sizes:
+        existing = [make_item(i) for i in range(size)]
+        new_items = [make_item(i) for i in range(size, size + args.new)]
+        for name, bench in (("json", bench_legacy), ("jsonl", bench_jsonl)):
+            folder = Path(tempfile.mkdtemp(prefix="bench_meta_"))
+            try:
+                load_time, save_time = bench(folder, existing, new_items)
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+            print(f"{name:<8} {size:>9} {load_time:>8.2f} {save_time:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from benchmarks.mock_services import Faults, MockServices
+
+# -----------------------------------------------------------------------------
+# End-to-end scraper benchmark. Each scraper script's main() runs unchanged in
+# its own process against the local stand-ins in mock_services.py (search
+# APIs and asset hosts with configurable latency, bandwidth, 500s and 429s).
+# Reports items/s and MB/s from the run summary (see scraper_core/metrics.py)
+# plus CPU seconds and peak RSS of the process. --save writes the results as
+# JSON; --compare checks them against a saved run and exits non-zero when a
+# scraper got slower (or heavier) by more than --tolerance.
+# Usage: python benchmarks/bench_scrapers.py --items 1000 --save baseline.json
+#        python benchmarks/bench_scrapers.py --items 1000 --compare baseline.json
+# With --search-limit capping each Flim query, --shard-by years=... shows how
+# far a sharded crawl gets past the limit of a single query. --processes runs
+# downloads in that many worker processes (CPU seconds and peak RSS then
+# cover the coordinator and every worker).
+# -----------------------------------------------------------------------------
+
+SCRAPERS = {
+    "flim-video": "flim/flim_video_scraper.py",
+    "flim-still": "flim/flim_still_scraper.py",
+    "frameset": "frameset/frameset_scraper.py",
+}
+
+# Result fields compared against a baseline, and whether higher is better
+COMPARED = {"items_per_sec": True, "mb_per_sec": True, "cpu_seconds": False, "peak_rss_mb": False}
+
+
+def load_script(path):
+    spec = importlib.util.spec_from_file_location(f"bench_{Path(path).stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_child(args):
+    """Runs one scraper's main() in this process and prints its results as JSON."""
+    from scraper_core import rate_control
+    from scraper_core.shards import parse_shard_spec
+    rate_control.HOST_LIMITS.update(json.loads(args.host_limits))
+
+    module = load_script(ROOT / SCRAPERS[args.child])
+    output = Path(args.output)
+    module.TARGET_COUNT = args.items
+    module.OUTPUT_FOLDER = output
+    module.METRICS_PORT = None
+    if args.shard_by and hasattr(module, "SHARD_BY"):
+        module.SHARD_BY = parse_shard_spec(args.shard_by)
+    module.PROCESSES = args.processes
+    start = time.perf_counter()
+    module.main()
+    wall = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Only the largest worker's peak is known, so every worker counts as that
+    peak_rss = usage.ru_maxrss + (workers.ru_maxrss * args.processes if args.processes > 1 else 0)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss *= 1 if sys.platform == "darwin" else 1024
+    summary = json.loads((output / "_run_summary.json").read_text(encoding="utf-8"))
+    hosts = summary["hosts"].values()
+    print(json.dumps({
+        "downloaded": summary["downloaded"],
+        "failed": summary["failed"],
+        "bytes": summary["bytes"],
+        "seconds": round(wall, 3),
+        "items_per_sec": round(summary["downloaded"] / wall, 2),
+        "mb_per_sec": round(summary["bytes"] / wall / 1e6, 2),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime + workers.ru_utime + workers.ru_stime, 2),
+        "peak_rss_mb": round(peak_rss / 1e6, 1),
+        "requests": sum(h["requests"] for h in hosts),
+        "throttled": sum(h["throttled_429"] for h in hosts),
+        "retries": sum(h["retries"] for h in hosts),
+    }))
+
+
+def run_scraper(name, services, args, workdir):
+    output = workdir / name
+    log_path = workdir / f"{name}.log"
+    env = {**os.environ, **services.env(), "PYTHONPATH": str(ROOT)}
+    command = [sys.executable, __file__, "--child", name, "--items", str(args.items), "--output", str(output),
+               "--host-limits", json.dumps(services.host_limits())]
+    for spec in args.shard_by:
+        command += ["--shard-by", spec]
+    command += ["--processes", str(args.processes)]
+    with open(log_path, "w") as log:
+        process = subprocess.run(command, env=env, cwd=workdir, stdout=subprocess.PIPE, stderr=log, text=True)
+    if process.returncode != 0:
+        tail = log_path.read_text().splitlines()[-20:]
+        raise RuntimeError(f"{name} exited with {process.returncode}:\n" + "\n".join(tail))
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change against baseline per scraper; returns the regressions."""
+    regressions = []
+    print(f"\nvs baseline (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        changes = []
+        for field, higher_is_better in COMPARED.items():
+            old, new = baseline[name][field], result[field]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " REGRESSION"
+                regressions.append(f"{name} {field}")
+            changes.append(f"{field} {change:+.0%}{flag}")
+        print(f"  {name}: " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scrapers", nargs="*", help=f"scrapers to run (default: all of {', '.join(SCRAPERS)})")
+    parser.add_argument("--items", type=int, default=500, help="TARGET_COUNT for every scraper")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="seconds per search request")
+    parser.add_argument("--cdn-latency", type=float, default=0.02, help="seconds to first byte per asset")
+    parser.add_argument("--bandwidth", type=float, help="bytes/s per asset connection (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--video-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--image-size", type=int, default=256 * 1024)
+    parser.add_argument("--search-limit", type=int, help="most results one Flim search query returns")
+    parser.add_argument("--shard-by", action="append", default=[], metavar="FILTER=VALUE,...",
+                        help="SHARD_BY for the Flim scrapers, as for python -m scraper_core")
+    parser.add_argument("--processes", type=int, default=1, help="PROCESSES for every scraper (default: 1)")
+    parser.add_argument("--save", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON from an earlier --save to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    # Internal: run one scraper in this process
+    parser.add_argument("--child", choices=list(SCRAPERS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    parser.add_argument("--host-limits", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+    unknown = set(args.scrapers) - set(SCRAPERS)
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(sorted(unknown))}")
+
+    faults = {"error_rate": args.error_rate, "throttle_rate": args.throttle_rate, "retry_after": args.retry_after}
+    services = MockServices(
+        api=Faults(latency=args.api_latency, **faults),
+        cdn=Faults(latency=args.cdn_latency, bandwidth=args.bandwidth, **faults),
+        flim_video_size=args.video_size, flim_image_size=args.image_size,
+        frameset_video_size=args.video_size // 2, frameset_image_size=args.image_size,
+        max_results=args.search_limit,
+    )
+    workdir = Path(tempfile.mkdtemp(prefix="bench_scrapers_"))
+    bandwidth = f"{args.bandwidth / 1e6:.0f} MB/s" if args.bandwidth else "unlimited"
+    print(f"{args.items} items per scraper; API {args.api_latency * 1000:.0f} ms, CDN {args.cdn_latency * 1000:.0f} ms "
+          f"at {bandwidth}/connection; {args.error_rate:.0%} 500s, {args.throttle_rate:.0%} 429s")
+    print(f"{'scraper':<12} {'items':>6} {'seconds':>8} {'items/s':>8} {'MB/s':>7} {'CPU s':>6} "
+          f"{'peak RSS MB':>12} {'429s':>5} {'retries':>8}")
+    results = {}
+    try:
+        for name in args.scrapers or SCRAPERS:
+            r = run_scraper(name, services, args, workdir)
+            results[name] = r
+            print(f"{name:<12} {r['downloaded']:>6} {r['seconds']:>8.2f} {r['items_per_sec']:>8.1f} "
+                  f"{r['mb_per_sec']:>7.1f} {r['cpu_seconds']:>6.2f} {r['peak_rss_mb']:>12.1f} "
+                  f"{r['throttled']:>5} {r['retries']:>8}")
+    finally:
+        services.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        args.save.write_text(json.dumps({"args": vars(args) | {"save": None, "compare": None}, **results},
+                                        indent=2, default=str))
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            sys.exit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from id_processor import get_s3_path
+from scraper_core.sinks import LocalSink, ShardedLocalSink, TarShardSink, build_sink
+
+# -----------------------------------------------------------------------------
+# Storage sink write throughput with a synthetic stream: every item is written
+# through sink.open()/write()/commit() in chunk-sized pieces, like a download,
+# from several threads at once. Reports MB/s and items/s per backend, buffer
+# size and fsync policy, plus how fast a loader reads everything back (one
+# open per file vs streaming the tar shards; page cache dropped when running
+# as root). The S3 backend runs only with --s3-bucket (e.g. against a local
+# MinIO via --s3-endpoint-url).
+# Usage: python benchmarks/bench_sinks.py --items 2000 --size 262144 --workers 8
+# -----------------------------------------------------------------------------
+
+KIB = 1024
+
+
+def write_items(sink, names, payload, chunk_size, workers):
+    view = memoryview(payload)
+
+    def write(name):
+        writer = sink.open(name)
+        try:
+            for offset in range(0, len(view), chunk_size):
+                writer.write(view[offset:offset + chunk_size])
+            writer.commit(len(view))
+        finally:
+            writer.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(write, names))
+    sink.close()
+
+
+def drop_caches():
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+    except OSError:
+        pass
+
+
+def read_back(folder):
+    """Reads every stored asset the way a training loader would; returns bytes read."""
+    total = 0
+    shards = sorted(folder.glob("shard-*.tar"))
+    if shards:
+        for shard in shards:
+            with tarfile.open(shard, mode="r|") as tar:
+                for member in tar:
+                    if member.isfile():
+                        total += len(tar.extractfile(member).read())
+        return total
+    pending = [folder]
+    while pending:
+        with os.scandir(pending.pop()) as scanner:
+            for entry in scanner:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                else:
+                    with open(entry.path, "rb") as f:
+                        total += len(f.read())
+    return total
+
+
+def configurations(root, args):
+    for buffer_size in (64 * KIB, 256 * KIB, 1024 * KIB):
+        yield f"local buf={buffer_size // KIB}K", lambda b=buffer_size: LocalSink(root / "local", buffer_size=b)
+    for buffer_size in (256 * KIB, 1024 * KIB, 4096 * KIB):
+        yield f"sharded buf={buffer_size // KIB}K", lambda b=buffer_size: ShardedLocalSink(root / "sharded", buffer_size=b)
+    yield "sharded fsync", lambda: ShardedLocalSink(root / "sharded", fsync=True)
+    for buffer_size in (1024 * KIB, 4096 * KIB):
+        yield f"tar buf={buffer_size // KIB}K", lambda b=buffer_size: TarShardSink(root / "tar", buffer_size=b)
+    yield "tar fsync=item", lambda: TarShardSink(root / "tar", fsync="item")
+    # Only assets past the spool size (16 MiB, e.g. --size 67108864) take the sendfile path
+    yield "tar no sendfile", lambda: TarShardSink(root / "tar", sendfile=False)
+    if args.s3_bucket:
+        yield "s3", lambda: build_sink("s3", None, bucket=args.s3_bucket, endpoint_url=args.s3_endpoint_url,
+                                        prefix="bench_sinks")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=256 * KIB)
+    parser.add_argument("--chunk-size", type=int, default=32 * KIB)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--s3-bucket")
+    parser.add_argument("--s3-endpoint-url")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size)
+    names = [get_s3_path(f"item-{i}", "images", "jpg") for i in range(args.items)]
+    total_mb = args.items * args.size / 1e6
+    tmp = Path(tempfile.mkdtemp(prefix="bench_sinks_"))
+
+    print(f"{args.items} items x {args.size // KIB} KiB, {args.chunk_size // KIB} KiB chunks, {args.workers} threads")
+    print(f"{'sink':<22} {'seconds':>8} {'MB/s':>8} {'items/s':>9} {'read MB/s':>10}")
+    try:
+        for label, make_sink in configurations(tmp, args):
+            sink = make_sink()
+            start = time.perf_counter()
+            write_items(sink, names, payload, args.chunk_size, args.workers)
+            elapsed = time.perf_counter() - start
+            read = "-"
+            if getattr(sink, "folder", None):
+                drop_caches()
+                start = time.perf_counter()
+                read_mb = read_back(sink.folder) / 1e6
+                read = f"{read_mb / (time.perf_counter() - start):.1f}"
+            print(f"{label:<22} {elapsed:>8.2f} {total_mb / elapsed:>8.1f} {args.items / elapsed:>9.0f} {read:>10}")
+            for child in tmp.iterdir():
+                shutil.rmtree(child, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
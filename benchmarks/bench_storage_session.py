@@ -0,0 +1,75 @@
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from urllib3.util.retry import Retry
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.local_server import make_self_signed_cert, start_server
+from scraper_core.rate_control import RateController
+from scraper_core.sinks import LocalSink, download_to_sink
+from scraper_core.transport import build_session
+
+# -----------------------------------------------------------------------------
+# Flim still downloads from object storage: module-level requests.get (the old
+# S3 path, one TLS handshake per file) vs the pooled storage session, against
+# a local TLS stand-in. Reports stills/second and handshakes per download.
+# Usage: python benchmarks/bench_storage_session.py --files 500 --workers 48
+# -----------------------------------------------------------------------------
+
+
+def download_all(session, urls, folder, workers, verify):
+    sink = LocalSink(folder)
+
+    def fetch(entry):
+        i, url = entry
+        download_to_sink(session, url, sink, f"{i}.png", verify=verify)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fetch, enumerate(urls)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--size", type=int, default=512 * 1024)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=48)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_storage_"))
+    certfile = make_self_signed_cert(tmp)
+    server, base_url = start_server(latency=args.latency, certfile=certfile)
+    base_url = base_url.replace("127.0.0.1", "localhost")
+    urls = [f"{base_url}/still/{i}?size={args.size}" for i in range(args.files)]
+
+    # Unlimited controller so only connection reuse is measured
+    controller = RateController({"localhost": {"initial_limit": 10_000, "max_limit": 10_000}})
+    retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    sessions = [
+        ("requests.get", requests),
+        ("pooled", build_session(pool_size=args.workers, retries=retries, controller=controller)),
+    ]
+
+    print(f"{'session':<14} {'seconds':>8} {'stills/s':>9} {'handshakes':>11} {'per file':>9}")
+    try:
+        for name, session in sessions:
+            folder = tmp / name
+            folder.mkdir()
+            before = server.connections
+            start = time.perf_counter()
+            download_all(session, urls, folder, args.workers, str(certfile))
+            elapsed = time.perf_counter() - start
+            handshakes = server.connections - before
+            print(f"{name:<14} {elapsed:>8.2f} {args.files / elapsed:>9.1f} "
+                  f"{handshakes:>11} {handshakes / args.files:>9.2f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import generate_upload_plan as plan
+
+# -----------------------------------------------------------------------------
+# Upload plan generation over a synthetic sharded tree
+# (videos/{shard}/{name}.mp4, empty files): the old sequential scan with MD5
+# keys vs a full plan (every file stat'ed and recorded), then incremental
+# re-runs after adding files, with planned files re-checked (the default) and
+# skipped unstat'ed (RECHECK_PLANNED = False).
+# Reports seconds and plan lines emitted.
+# Usage: python benchmarks/bench_upload_plan.py --files 1000000 --added 10000
+# -----------------------------------------------------------------------------
+
+
+def make_tree(root, start, count):
+    for i in range(start, start + count):
+        name = f"{i:020d}.mp4"
+        shard = hashlib.md5(name.encode()).hexdigest()[:2]
+        directory = root / "videos" / shard
+        if i == start or not directory.exists():
+            directory.mkdir(parents=True, exist_ok=True)
+        os.close(os.open(directory / name, os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def legacy_plan(root, output):
+    count = 0
+    with open(output, "w") as f:
+        pending = [root]
+        while pending:
+            with os.scandir(pending.pop()) as scanner:
+                for entry in scanner:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.is_file() and entry.name.endswith(".mp4"):
+                        shard = hashlib.md5(entry.name.encode("utf-8")).hexdigest()[:2]
+                        f.write(f"cp {entry.path} s3://bucket/videos/{shard}/{entry.name}\n")
+                        count += 1
+    return count
+
+
+def count_lines(paths):
+    total = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def run_plan(root, output, parts, incremental=True, recheck=True):
+    plan.SOURCE = str(root)
+    plan.OUTPUT = str(output)
+    plan.PLAN_FILES = parts
+    plan.INCREMENTAL = incremental
+    plan.RECHECK_PLANNED = recheck
+    with contextlib.redirect_stdout(io.StringIO()):
+        plan.main()
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--added", type=int, default=10_000)
+    parser.add_argument("--parts", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_plan_"))
+    root = tmp / "tree"
+    try:
+        start = time.perf_counter()
+        make_tree(root, 0, args.files)
+        print(f"Built {args.files} files in {time.perf_counter() - start:.1f}s")
+        plan.SCAN_WORKERS = args.workers
+        plan.BUCKET = "bucket"
+
+        print(f"{'run':<32} {'seconds':>8} {'lines':>10}")
+
+        start = time.perf_counter()
+        lines = legacy_plan(root, tmp / "legacy.txt")
+        print(f"{'legacy sequential scan':<32} {time.perf_counter() - start:>8.2f} {lines:>10}")
+
+        start = time.perf_counter()
+        run_plan(root, tmp / "full.txt", args.parts, incremental=False)
+        elapsed = time.perf_counter() - start
+        paths = sorted(tmp.glob("full*.txt"))
+        print(f"{'full plan':<32} {elapsed:>8.2f} {count_lines(paths):>10}")
+
+        for name, recheck, start_at in (("rechecked", True, args.files),
+                                        ("unchecked", False, args.files + args.added)):
+            make_tree(root, start_at, args.added)
+            start = time.perf_counter()
+            run_plan(root, tmp / f"{name}.txt", args.parts, recheck=recheck)
+            elapsed = time.perf_counter() - start
+            paths = sorted(tmp.glob(f"{name}*.txt"))
+            print(f"{f'incremental {name} (+{args.added})':<32} {elapsed:>8.2f} {count_lines(paths):>10}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
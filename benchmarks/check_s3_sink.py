@@ -0,0 +1,282 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.local_server import AssetHandler, start_server
+from scraper_core.engine import Attempt, Engine, Source
+from scraper_core.id_index import IdIndex
+from scraper_core.object_store import MIN_PART_SIZE, S3Sink
+from scraper_core.sinks import download_to_sink
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    sys.exit("boto3 and moto are required (pip install boto3 moto)")
+
+# -----------------------------------------------------------------------------
+# Checks S3Sink against an in-memory S3 (moto): an object smaller than one
+# part goes up with a single PutObject, a larger one as a multipart upload
+# that reassembles byte for byte, and a transfer that fails partway (dropped
+# connection, or a part upload the store refuses) aborts its multipart upload
+# and leaves no object behind. The engine checks run a whole Engine with
+# S3Sink against a local asset server: every item ends up in the bucket, and
+# a resumed run marks objects a crashed run uploaded without fetching them
+# again. Exits non-zero if any check fails.
+# Usage: python benchmarks/check_s3_sink.py
+# -----------------------------------------------------------------------------
+
+BUCKET = "check-s3-sink"
+PART_SIZE = MIN_PART_SIZE
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+class CountingClient:
+    """Wraps a boto3 client, counting calls and failing upload_part for fail_part."""
+
+    def __init__(self, client, fail_part=None):
+        self.client = client
+        self.fail_part = fail_part
+        self.calls = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(**kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if name == "upload_part" and kwargs["PartNumber"] == self.fail_part:
+                raise ConnectionError(f"part {self.fail_part} refused")
+            return method(**kwargs)
+        return call
+
+
+class DroppedResponse:
+    """A requests-style 200 response whose connection drops after `sent` bytes of payload."""
+
+    status_code = 200
+    raw = None
+
+    def __init__(self, payload, sent):
+        self.payload = payload
+        self.sent = sent
+        self.headers = {"Content-Length": str(len(payload))}
+
+    def iter_content(self, chunk_size=None):
+        for offset in range(0, self.sent, chunk_size):
+            yield self.payload[offset:min(offset + chunk_size, self.sent)]
+        raise ConnectionError("connection dropped")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class DroppingSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+class CountingHandler(AssetHandler):
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with CountingHandler.lock:
+            CountingHandler.requests += 1
+        super().do_GET()
+
+
+class AssetSource(Source):
+    """ITEMS items on one page, each an asset of its size on the local server."""
+
+    name = "check-s3"
+    label = "assets"
+    asset_type = "videos"
+    first_page = 1
+    sizes = [64 * 1024, PART_SIZE // 2, PART_SIZE + 4096]
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(target_count=len(self.sizes), download_workers=2, **kwargs)
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def fetch_page(self, page):
+        if page > 1:
+            return []
+        return [{"id": f"check-{i}", "size": size} for i, size in enumerate(self.sizes)]
+
+    def attempts(self, item, item_id):
+        relpath = self.asset_path(item_id, "mp4")
+        return [Attempt(f"{self.base_url}/{item_id}.mp4?size={item['size']}", relpath)]
+
+    def close(self):
+        self.session.close()
+
+
+def payload(size):
+    return os.urandom(size)
+
+
+def write(sink, relpath, data, chunk_size=256 * 1024):
+    writer = sink.open(relpath)
+    try:
+        for offset in range(0, len(data), chunk_size):
+            writer.write(data[offset:offset + chunk_size])
+        return writer.commit(len(data))
+    finally:
+        writer.close()
+
+
+def stored(s3, key):
+    try:
+        return s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    except s3.exceptions.NoSuchKey:
+        return None
+
+
+def open_uploads(s3):
+    return s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+
+
+def check_single_put(s3):
+    client = CountingClient(s3)
+    sink = S3Sink(BUCKET, prefix="assets", part_size=PART_SIZE, client=client)
+    data = payload(PART_SIZE // 2)
+    location = write(sink, "videos/ab/small.mp4", data)
+    sink.close()
+    expect(location == f"s3://{BUCKET}/assets/videos/ab/small.mp4", f"unexpected location {location}")
+    expect(stored(s3, "assets/videos/ab/small.mp4") == data, "stored object differs from what was written")
+    expect(client.calls.get("put_object") == 1, "expected exactly one PutObject")
+    expect("create_multipart_upload" not in client.calls, "a small object started a multipart upload")
+
+
+def check_multipart(s3):
+    client = CountingClient(s3)
+    sink = S3Sink(BUCKET, part_size=PART_SIZE, max_buffers=4, client=client)
+    # Two full parts and a short last one
+    data = payload(2 * PART_SIZE + PART_SIZE // 3)
+    write(sink, "videos/cd/large.mp4", data)
+    sink.close()
+    expect(stored(s3, "videos/cd/large.mp4") == data, "multipart object differs from what was written")
+    expect(client.calls.get("upload_part") == 3, f"expected 3 parts, uploaded {client.calls.get('upload_part')}")
+    expect(client.calls.get("complete_multipart_upload") == 1, "multipart upload was not completed")
+    expect("put_object" not in client.calls, "a multipart object also went up with PutObject")
+    expect(not open_uploads(s3), "a completed upload is still listed as in progress")
+
+
+def check_dropped_connection(s3):
+    client = CountingClient(s3)
+    sink = S3Sink(BUCKET, part_size=PART_SIZE, client=client)
+    data = payload(3 * PART_SIZE)
+    session = DroppingSession(DroppedResponse(data, sent=2 * PART_SIZE + 1024))
+    try:
+        download_to_sink(session, "https://cdn.example/dropped.mp4", sink, "videos/ef/dropped.mp4",
+                         resume_attempts=0)
+    except OSError:
+        pass
+    else:
+        raise CheckFailed("a dropped connection did not fail the download")
+    sink.close()
+    expect(client.calls.get("upload_part", 0) >= 1, "the transfer failed before any part went up")
+    expect(client.calls.get("abort_multipart_upload") == 1, "the multipart upload was not aborted")
+    expect(not open_uploads(s3), "an aborted upload is still listed as in progress")
+    expect(stored(s3, "videos/ef/dropped.mp4") is None, "a failed transfer left an object behind")
+
+
+def check_refused_part(s3):
+    client = CountingClient(s3, fail_part=2)
+    sink = S3Sink(BUCKET, part_size=PART_SIZE, client=client)
+    data = payload(3 * PART_SIZE)
+    try:
+        write(sink, "videos/gh/refused.mp4", data)
+    except ConnectionError:
+        pass
+    else:
+        raise CheckFailed("a refused part did not fail the commit")
+    sink.close()
+    expect("complete_multipart_upload" not in client.calls, "an upload with a missing part was completed")
+    expect(client.calls.get("abort_multipart_upload") == 1, "the multipart upload was not aborted")
+    expect(not open_uploads(s3), "an aborted upload is still listed as in progress")
+    expect(stored(s3, "videos/gh/refused.mp4") is None, "a failed transfer left an object behind")
+
+
+def run_engine(s3, base_url, folder):
+    source = AssetSource(base_url, output_folder=folder, sink=S3Sink(BUCKET, prefix="engine", client=s3))
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(stats=Engine(source).run()), daemon=True)
+    thread.start()
+    thread.join(60)
+    expect(not thread.is_alive(), "the engine run did not finish within 60s")
+    return source, result["stats"]
+
+
+def check_engine_run(s3):
+    server, base_url = start_server(handler=CountingHandler)
+    folder = tempfile.mkdtemp(prefix="check_s3_")
+    try:
+        source, stats = run_engine(s3, base_url, folder)
+        expect(stats["downloaded"] == len(source.sizes), f"engine stats: {stats}")
+        for item in source.fetch_page(1):
+            relpath = source.attempts(item, item["id"])[0].filename
+            body = stored(s3, f"engine/{relpath}")
+            expect(body is not None and len(body) == item["size"], f"{relpath} missing or truncated in the bucket")
+
+        # A crash after the uploads but before the index recorded them:
+        # the items are queued again and the objects are already there
+        ids = [item["id"] for item in source.fetch_page(1)]
+        with sqlite3.connect(Path(folder) / "_index.sqlite") as conn:
+            conn.execute("UPDATE ids SET queued = 1, downloaded = 0, filename = NULL")
+        fetched = CountingHandler.requests
+        source, stats = run_engine(s3, base_url, folder)
+        expect(stats["skipped"] == len(ids), f"resumed run re-uploaded objects: {stats}")
+        expect(CountingHandler.requests == fetched, "resumed run fetched assets already in the bucket")
+        index = IdIndex(Path(folder) / "_index.sqlite")
+        locations = {item_id: filename for item_id, _, filename in index.iter_manifest()}
+        index.close()
+        expect(all(locations.get(item_id, "").startswith(f"s3://{BUCKET}/engine/") for item_id in ids),
+               f"resumed items not marked at their s3:// URL: {locations}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+CHECKS = [check_single_put, check_multipart, check_dropped_connection, check_refused_part, check_engine_run]
+
+
+def main():
+    failed = 0
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        for check in CHECKS:
+            try:
+                check(s3)
+                print(f"ok    {check.__name__}")
+            except CheckFailed as e:
+                failed += 1
+                print(f"FAIL  {check.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import random
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -----------------------------------------------------------------------------
+# Local HTTP stand-in for the asset CDN used by the benchmarks.
+# GET /asset/<name>?size=<bytes> returns <size> bytes after LATENCY seconds.
+# Range requests are honoured (206 + Content-Range), and with BANDWIDTH set
+# each connection is paced to that many bytes per second, like a CDN's
+# per-stream cap. Byte i of every asset is i % 256. ERROR_RATE and
+# THROTTLE_RATE answer that share of requests with a 500 or a 429 (with
+# Retry-After) instead.
+# -----------------------------------------------------------------------------
+
+DEFAULT_SIZE = 256 * 1024
+_PAYLOAD = bytes(range(256)) * 4096  # 1 MiB pattern reused for every response
+
+
+def parse_range(value, size):
+    """(start, end) inclusive for "bytes=a-b" / "bytes=a-", or None."""
+    if not value or not value.startswith("bytes="):
+        return None
+    first, _, last = value[6:].partition("-")
+    start = int(first) if first else 0
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    bandwidth = None  # bytes/s per connection
+    error_rate = 0.0
+    throttle_rate = 0.0
+    retry_after = 1
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self.inject_fault():
+            return
+        size = self.asset_size(path, params)
+        if size is None:
+            self.send_empty(404)
+            return
+
+        span = parse_range(self.headers.get("Range"), size)
+        if span and span[0] >= size:
+            self.send_empty(416, {"Content-Range": f"bytes */{size}"})
+            return
+        start, end = span or (0, size - 1)
+
+        self.send_response(206 if span else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end + 1 - start))
+        if span:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        self.send_bytes(start, end + 1 - start)
+
+    def asset_size(self, path, params):
+        """Size of the asset at path, or None for a 404."""
+        return int(params.get("size", DEFAULT_SIZE))
+
+    def inject_fault(self):
+        """Answers with an injected 429 or 500 and returns True, at the configured rates."""
+        roll = random.random()
+        if roll < self.throttle_rate:
+            self.send_empty(429, {"Retry-After": str(self.retry_after)})
+        elif roll < self.throttle_rate + self.error_rate:
+            self.send_empty(500)
+        else:
+            return False
+        return True
+
+    def send_empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_bytes(self, offset, remaining):
+        # Small pieces keep the pacing smooth; unpaced, write as much as the pattern allows
+        piece = 64 * 1024 if self.bandwidth else len(_PAYLOAD) - 256
+        began = time.monotonic()
+        sent = 0
+        while remaining > 0:
+            n = min(remaining, piece)
+            head = offset % 256
+            self.wfile.write(_PAYLOAD[head:head + n])
+            offset += n
+            remaining -= n
+            sent += n
+            if self.bandwidth:
+                ahead = sent / self.bandwidth - (time.monotonic() - began)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    # Accepted connections; with TLS each one is a full handshake
+    connections = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.connections += 1
+        return request
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-response on purpose (e.g. once a segment is complete)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def make_self_signed_cert(directory):
+    """Creates a localhost certificate with the openssl CLI; returns its path."""
+    directory = Path(directory)
+    certfile = directory / "localhost.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+         "-keyout", str(certfile), "-out", str(certfile)],
+        check=True, capture_output=True,
+    )
+    return certfile
+
+
+def start_server(latency=0.0, handler=AssetHandler, certfile=None, bandwidth=None, address="127.0.0.1", **options):
+    """
+    Starts a stand-in server on a free port; returns (server, base_url).
+    With certfile (cert and key in one PEM) the server speaks TLS; bandwidth
+    caps each connection at that many bytes per second. options set other
+    handler attributes (error_rate, throttle_rate, ...). Any 127.x.y.z
+    address works on Linux, which gives each stand-in its own hostname.
+    """
+    handler_cls = type("BoundHandler", (handler,), {"latency": latency, "bandwidth": bandwidth, **options})
+    server = LocalServer((address, 0), handler_cls)
+    scheme = "http"
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"{scheme}://{host}:{port}"
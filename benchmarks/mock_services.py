@@ -0,0 +1,277 @@
+import base64
+import json
+import math
+import time
+from dataclasses import asdict, dataclass
+
+from benchmarks.local_server import AssetHandler, start_server
+from scraper_core.rate_control import HOST_LIMITS
+
+# -----------------------------------------------------------------------------
+# Local stand-ins for every service the scrapers talk to, so their main()s can
+# run end to end without network access:
+#   Flim search API      POST /2.0.0/search        (api.flim.ai)
+#   Flim video CDN       GET  /videos/<id>.mp4     (CloudFront)
+#   Flim still storage   GET  /stills/<id>.jpg     (pre-signed S3)
+#   Frameset search      GET  /api/search          (frameset.app)
+#   Frameset CDN         GET  /<id>_fs.mp4, ...    (CloudFront)
+# Each service listens on its own loopback address, so the rate controller
+# keeps a separate limiter per service, tuned like the host it stands in for.
+# Latency, per-connection bandwidth, 500s and 429s are set per service with
+# Faults. Catalogs are deterministic: the same page always lists the same ids.
+# Flim search honours its filters, so sharded crawls can be benchmarked, and
+# can cap results per query (max_results) like a search engine's window.
+# -----------------------------------------------------------------------------
+
+# Loopback address of each stand-in and the production host whose tuning it gets
+SERVICES = {
+    "flim-api": ("127.0.0.2", "api.flim.ai"),
+    "flim-cdn": ("127.0.0.3", "cloudfront.net"),
+    "flim-storage": ("127.0.0.4", "amazonaws.com"),
+    "frameset": ("127.0.0.5", "frameset.app"),
+    "frameset-cdn": ("127.0.0.6", "cloudfront.net"),
+}
+
+# Extensions the Frameset CDN stand-in has; the scraper probes the others first
+FRAMESET_EXTENSIONS = {"_fs": "mp4", "_xl": "jpg"}
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0       # seconds before each response
+    bandwidth: float = None    # bytes/s per connection
+    error_rate: float = 0.0    # share of requests answered with a 500
+    throttle_rate: float = 0.0  # share of requests answered with a 429
+    retry_after: int = 1
+
+
+class _JsonHandler(AssetHandler):
+    def send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FlimSearchHandler(_JsonHandler):
+    """
+    Flim search: pages of video items (has_video_cuts) or still items,
+    narrowed by the years, genres, shot_types, aspect_ratio and
+    camera_motions filters and their negative filters. Like a search engine
+    with a result window, a query returns at most max_results items.
+    """
+
+    cdn_base = None
+    storage_base = None
+    catalog = 1_000_000
+    max_results = None
+    video_size = 2 * 1024 * 1024
+    image_size = 256 * 1024
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.inject_fault():
+            return
+        if not self.headers.get("authorization"):
+            self.send_empty(401)
+            return
+        search = body.get("search", {})
+        videos = search.get("filters", {}).get("has_video_cuts", False)
+        per_page = body.get("number_per_pages", 200)
+        first = body.get("page", 0) * per_page
+        numbers, total = self.matches(search.get("filters", {}), search.get("negative_filters", {}), first, per_page)
+        items = [self.video_item(n) if videos else self.still_item(n) for n in numbers]
+        self.send_json({"query_response": {"images": items, "total": total}})
+
+    def matches(self, filters, negative_filters, first, count):
+        """Catalog numbers first..first+count of the filtered results, and how many results there are."""
+        wanted = {k: set(v) for k, v in filters.items() if k in FILTER_FIELDS and v}
+        # The scrapers always exclude ANIMATION, which no catalog item has
+        unwanted = {k: set(v) for k, v in negative_filters.items() if k in FILTER_FIELDS and v and k != "genres"}
+        unwanted_genres = set(negative_filters.get("genres", [])) - {"ANIMATION"}
+        if unwanted_genres:
+            unwanted["genres"] = unwanted_genres
+        # Item fields repeat every FIELD_PERIOD numbers, so the matches do too
+        residues = [n for n in range(FIELD_PERIOD) if _matches(n, wanted, unwanted)]
+        full, rest = divmod(self.catalog, FIELD_PERIOD)
+        total = full * len(residues) + sum(1 for n in residues if n < rest)
+        total = min(total, self.max_results or total)
+        numbers = [(k // len(residues)) * FIELD_PERIOD + residues[k % len(residues)]
+                   for k in range(first, min(first + count, total))]
+        return numbers, total
+
+    def video_item(self, n):
+        item_id = f"flim-v{n:08d}"
+        return {
+            "id": item_id,
+            "has_video_urls": True,
+            "video_urls": {"url_full": f"{self.cdn_base}/videos/{item_id}.mp4?size={self.video_size}"},
+            **_item_details(n),
+        }
+
+    def still_item(self, n):
+        item_id = f"flim-s{n:08d}"
+        return {
+            "id": item_id,
+            "has_video_urls": False,
+            "full_resolution_url": (f"{self.storage_base}/stills/{item_id}.jpg?size={self.image_size}"
+                                    f"&X-Amz-Signature=bench"),
+            **_item_details(n),
+        }
+
+
+SHOT_TYPES = ["WIDE", "MEDIUM", "CLOSE_UP"]
+ASPECT_RATIOS = ["2.39", "1.85", "1.33"]
+CAMERA_MOTIONS = ["STATIC", "PAN", "DOLLY", "HANDHELD"]
+
+
+def _item_fields(n):
+    # The values each search filter matches on, one (or for genres a list) per item
+    return {
+        "years": 1960 + n % 60,
+        "genres": ["DRAMA", "THRILLER"][: 1 + n % 2] + (["COMEDY"] if n % 5 == 0 else []),
+        "shot_types": SHOT_TYPES[n % 3],
+        "aspect_ratio": ASPECT_RATIOS[n // 7 % 3],
+        "camera_motions": CAMERA_MOTIONS[n // 11 % 4],
+    }
+
+
+FILTER_FIELDS = set(_item_fields(0))
+# Every field above is periodic in n; this is the period of all of them together
+FIELD_PERIOD = math.lcm(60, 10, 3, 7 * 3, 11 * 4)
+
+
+def _matches(n, wanted, unwanted):
+    fields = _item_fields(n)
+    for name, values in wanted.items():
+        value = fields[name]
+        if values.isdisjoint(value) if isinstance(value, list) else value not in values:
+            return False
+    for name, values in unwanted.items():
+        value = fields[name]
+        if not values.isdisjoint(value) if isinstance(value, list) else value in values:
+            return False
+    return True
+
+
+def _item_details(n):
+    # Roughly the shape and size of a real search result
+    fields = _item_fields(n)
+    return {
+        "title": f"Shot {n}",
+        "movie": {"title": f"Movie {n // 50}", "year": fields["years"], "director": f"Director {n % 97}"},
+        "genres": fields["genres"],
+        "colors": ["#1a2b3c", "#4d5e6f", "#708090"],
+        "shot_type": fields["shot_types"],
+        "aspect_ratio": fields["aspect_ratio"],
+        "camera_motion": fields["camera_motions"],
+        "width": 1920,
+        "height": 804,
+    }
+
+
+class FramesetSearchHandler(_JsonHandler):
+    """Frameset search: pages of motion and still results keyed by "_id"."""
+
+    catalog = 1_000_000
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.inject_fault():
+            return
+        if path != "/api/search":
+            self.send_empty(404)
+            return
+        size = int(params.get("size", 400))
+        first = (int(params.get("page", 1)) - 1) * size
+        results = [{"_id": f"fs{n:08d}", "type": "motion" if n % 2 else "still", "title": f"Frame {n}",
+                    "tags": ["interior", "night"], "film": f"Film {n // 40}"}
+                   for n in range(first, min(first + size, self.catalog))]
+        self.send_json({"success": True, "data": {"results": results}})
+
+
+class CdnHandler(AssetHandler):
+    """
+    Asset hosts. ?size= gives an asset's size; Frameset names carry none, so
+    they get video_size or image_size by suffix, and only the extensions in
+    FRAMESET_EXTENSIONS exist.
+    """
+
+    video_size = 1024 * 1024
+    image_size = 256 * 1024
+
+    def asset_size(self, path, params):
+        if "size" in params:
+            return int(params["size"])
+        name, _, ext = path.rpartition("/")[2].rpartition(".")
+        suffix = name[-3:]
+        if FRAMESET_EXTENSIONS.get(suffix) != ext:
+            return None
+        return self.video_size if suffix == "_fs" else self.image_size
+
+
+def _b64_json(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def fake_jwt(hours=24):
+    """An unsigned JWT that passes the scrapers' expiry check."""
+    return f"Bearer {_b64_json({'alg': 'none'})}.{_b64_json({'exp': int(time.time() + hours * 3600)})}.bench"
+
+
+class MockServices:
+    """
+    Starts every stand-in. env() gives the environment that points the
+    scrapers at them; host_limits() the rate-control tuning per stand-in.
+    """
+
+    def __init__(self, api=None, cdn=None, flim_video_size=2 * 1024 * 1024, flim_image_size=256 * 1024,
+                 frameset_video_size=1024 * 1024, frameset_image_size=256 * 1024, catalog=1_000_000,
+                 max_results=None):
+        api = asdict(api or Faults())
+        cdn = asdict(cdn or Faults())
+        self.servers = {}
+        self.urls = {}
+        for name, handler, faults, options in [
+            ("flim-cdn", CdnHandler, cdn, {}),
+            ("flim-storage", CdnHandler, cdn, {}),
+            ("frameset-cdn", CdnHandler, cdn,
+             {"video_size": frameset_video_size, "image_size": frameset_image_size}),
+            ("frameset", FramesetSearchHandler, api, {"catalog": catalog}),
+        ]:
+            self._start(name, handler, faults, options)
+        self._start("flim-api", FlimSearchHandler, api, {
+            "cdn_base": self.urls["flim-cdn"], "storage_base": self.urls["flim-storage"], "catalog": catalog,
+            "max_results": max_results,
+            "video_size": flim_video_size, "image_size": flim_image_size,
+        })
+
+    def _start(self, name, handler, faults, options):
+        address, _ = SERVICES[name]
+        server, url = start_server(handler=handler, address=address, **faults, **options)
+        self.servers[name] = server
+        self.urls[name] = url
+
+    def env(self):
+        return {
+            "FLIM_SEARCH_URL": f"{self.urls['flim-api']}/2.0.0/search",
+            "FLIM_AUTH_TOKEN": fake_jwt(),
+            "FRAMESET_SEARCH_URL": f"{self.urls['frameset']}/api/search",
+            "FRAMESET_CDN_BASE": self.urls["frameset-cdn"],
+            "FRAMESET_COOKIE_STRING": "bench_session=1",
+        }
+
+    def host_limits(self):
+        return {address: HOST_LIMITS.get(host, {}) for address, host in SERVICES.values()}
+
+    def close(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
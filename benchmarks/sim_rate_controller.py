@@ -0,0 +1,117 @@
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scraper_core.rate_control import HostLimiter, record_response
+
+# -----------------------------------------------------------------------------
+# Drives a HostLimiter against a simulated server whose throughput peaks at
+# CAPACITY concurrent requests. Past that, latency grows with queueing, and
+# past OVERLOAD x CAPACITY the server starts answering 429.
+# The limiter lets latency rise to latency_tolerance x the no-load latency,
+# which on this server is latency_tolerance x CAPACITY in flight, so that is
+# where the limit should settle. Exits non-zero if the settled limit is more
+# than --max-deviation from it, or throughput below --min-throughput of peak.
+# Usage: python benchmarks/sim_rate_controller.py --capacity 32 --seconds 20
+# -----------------------------------------------------------------------------
+
+
+class SimulatedServer:
+    def __init__(self, capacity, base_latency, overload):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.overload = overload
+        self.in_flight = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def request(self):
+        with self._lock:
+            self.in_flight += 1
+            load = self.in_flight / self.capacity
+        try:
+            if load > self.overload and random.random() < 0.5:
+                time.sleep(self.base_latency / 4)
+                return 429, self.base_latency / 4
+            latency = self.base_latency * max(1.0, load) * random.uniform(0.9, 1.1)
+            time.sleep(latency)
+            with self._lock:
+                self.completed += 1
+            return 200, latency
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--overload", type=float, default=1.5)
+    parser.add_argument("--workers", type=int, default=512)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--initial", type=int, default=8)
+    parser.add_argument("--latency-tolerance", type=float, default=None)
+    parser.add_argument("--max-deviation", type=float, default=0.2)
+    parser.add_argument("--min-throughput", type=float, default=0.85)
+    args = parser.parse_args()
+
+    server = SimulatedServer(args.capacity, args.latency, args.overload)
+    tuning = {} if args.latency_tolerance is None else {"latency_tolerance": args.latency_tolerance}
+    limiter = HostLimiter("sim", initial_limit=args.initial, max_limit=args.workers,
+                          cooldown=args.latency * 5, pause_on_throttle=args.latency, **tuning)
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            limiter.acquire()
+            try:
+                status, latency = server.request()
+                record_response(limiter, status, latency)
+            finally:
+                limiter.release()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.workers)]
+    for t in threads:
+        t.start()
+
+    samples = []
+    rates = []
+    last_completed = 0
+    print(f"{'t':>4} {'limit':>7} {'in-flight':>9} {'req/s':>8}")
+    for second in range(1, int(args.seconds) + 1):
+        time.sleep(1)
+        completed = server.completed
+        samples.append(limiter.limit)
+        rates.append(completed - last_completed)
+        print(f"{second:>4} {limiter.limit:>7.1f} {limiter.in_flight:>9} {completed - last_completed:>8}")
+        last_completed = completed
+    stop.set()
+
+    half = len(samples) // 2
+    mean_limit = sum(samples[half:]) / len(samples[half:])
+    mean_rps = sum(rates[half:]) / len(rates[half:])
+    optimum_rps = args.capacity / args.latency
+    target = args.capacity * limiter.latency_tolerance
+    print(f"Optimum concurrency: {args.capacity} ({optimum_rps:.0f} req/s)")
+    print(f"Settled limit (second half mean): {mean_limit:.1f} ({mean_limit / args.capacity:.0%} of optimum, "
+          f"expected {target:.1f} at latency tolerance {limiter.latency_tolerance})")
+    print(f"Settled throughput: {mean_rps:.0f} req/s ({mean_rps / optimum_rps:.0%} of optimum)")
+    print(f"Throttled: {limiter.stats['throttled']}, backoffs: {limiter.stats['decreases']}")
+
+    failures = []
+    if abs(mean_limit - target) > args.max_deviation * target:
+        failures.append(f"limit {mean_limit:.1f} is more than {args.max_deviation:.0%} off {target:.1f}")
+    if mean_rps < args.min_throughput * optimum_rps:
+        failures.append(f"throughput is below {args.min_throughput:.0%} of optimum")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,189 @@
 import os
 import hashlib
+from collections import Counter, defaultdict
+from itertools import islice
+
+from id_processor import get_s3_paths
+from scraper_core.id_index import IdIndex
+from scraper_core.upload_plan import PlannedManifest, PlanWriter, scan_tree
 
 # --- CONFIGURATION ---
-BUCKET = "BUCKET NAME"      
+BUCKET = "BUCKET NAME"
 PREFIX = "videos"
 SOURCE = "SOURCE DIRECTORY"
 OUTPUT = "s3_upload_plan.txt"
+# Scraper id index inside SOURCE. When present, the plan is read from its
+# download manifest instead of scanning the folder.
+INDEX = "_index.sqlite"
+EXTENSIONS = (".mp4",)
+# Only plan files that are new since the last plan. The record of planned
+# files lives in PLANNED inside SOURCE.
+INCREMENTAL = True
+PLANNED = "_planned.tsv"
+# Scans stat files already planned and re-plan any whose size/mtime changed.
+# False skips them from the listing alone: faster, but a rewritten file is
+# never uploaded again.
+RECHECK_PLANNED = True
+# Split the plan into this many files, one per parallel `s5cmd run` worker
+PLAN_FILES = 1
+SCAN_WORKERS = 16
+# Verification: set VERIFY_LISTING to the output of `s5cmd ls "s3://BUCKET/*"`
+# to report assets uploaded under the old MD5 scheme instead of planning.
+# Commands that move them to their id_processor keys go to VERIFY_OUTPUT.
+VERIFY_LISTING = None
+VERIFY_OUTPUT = "s3_migration_plan.txt"
 # ---------------------
 
-def main():
-    if not os.path.exists(SOURCE):
-        print(f"Error: Source not found: {SOURCE}")
-        return
+CHUNK = 10000
+
+def legacy_key(fname):
+    # Hash sharding used before keys came from id_processor
+    hash_obj = hashlib.md5(fname.encode('utf-8'))
+    shard = hash_obj.hexdigest()[:2]
+    return f"{PREFIX}/{shard}/{fname}"
+
+def s3_keys(relpaths):
+    """
+    S3 keys for a batch of paths relative to SOURCE. Sharded downloads already
+    sit at their id_processor key; flat `{id}.{ext}` files are mapped to
+    `{PREFIX}/{shard}/{uuid}.{ext}` in one batch per extension.
+    """
+    keys = list(relpaths)
+    flat = defaultdict(list)
+    for i, relpath in enumerate(relpaths):
+        if "/" not in relpath:
+            item_id, _, ext = relpath.rpartition(".")
+            flat[ext].append((i, item_id))
+    for ext, rows in flat.items():
+        paths = get_s3_paths([item_id for _, item_id in rows], PREFIX, ext)
+        for (i, _), key in zip(rows, paths):
+            keys[i] = key
+    return keys
+
+def chunked(iterable, size=CHUNK):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
 
-    print(f"Scanning {SOURCE}...")
-    count = 0
+def iter_manifest_entries(index_path):
+    """
+    Yields (item_id, relpath) for every downloaded asset recorded in the
+    scraper index. Assets a scraper wrote through a non-local sink are
+    recorded as URLs (s3://, tar://) and are skipped.
+    """
+    index = IdIndex(index_path)
+    try:
+        for item_id, guid, filename in index.iter_manifest():
+            if "://" not in filename:
+                yield item_id, filename
+    finally:
+        index.close()
 
-    with open(OUTPUT, "w") as f:
-        with os.scandir(SOURCE) as scanner:
-            for entry in scanner:
-                if entry.is_file() and entry.name.endswith(".mp4"):
-                    fname = entry.name
+def iter_local_assets(index_path, skip=()):
+    """
+    Yields (item_id, relpath, size, mtime_ns) for files ending in one of
+    EXTENSIONS. From the index manifest, size and mtime are None: paths there
+    never change once written. From a scan, item_id is None for sharded
+    files, whose names are UUIDs, and paths in skip are left out.
+    """
+    if os.path.exists(index_path):
+        print(f"Reading download manifest from {index_path}...")
+        for item_id, relpath in iter_manifest_entries(index_path):
+            if relpath.endswith(EXTENSIONS):
+                yield item_id, relpath, None, None
+    else:
+        print(f"Scanning {SOURCE} with {SCAN_WORKERS} workers...")
+        for relpath, size, mtime_ns in scan_tree(SOURCE, suffixes=EXTENSIONS, workers=SCAN_WORKERS, skip=skip):
+            item_id = None if "/" in relpath else relpath.rpartition(".")[0]
+            yield item_id, relpath, size, mtime_ns
 
-                    # Hash Sharding
-                    hash_obj = hashlib.md5(fname.encode('utf-8'))
-                    shard = hash_obj.hexdigest()[:2]
+def plan(index_path):
+    planned = PlannedManifest(os.path.join(SOURCE, PLANNED))
+    if not INCREMENTAL:
+        planned.reset()
+    elif len(planned):
+        changed = " or changed" if RECHECK_PLANNED else ""
+        print(f"{len(planned)} files already planned; emitting new{changed} files only")
+        if not RECHECK_PLANNED:
+            print(f"Warning: {len(planned)} planned files skipped without a size/mtime check; "
+                  f"a rewritten one won't be re-uploaded (set RECHECK_PLANNED = True)")
 
-                    cmd = f"cp {entry.path} s3://{BUCKET}/{PREFIX}/{shard}/{fname}\n"
+    assets = iter_local_assets(index_path, skip=() if RECHECK_PLANNED else planned.paths())
+    entries = ((relpath, size, mtime_ns) for _, relpath, size, mtime_ns in assets)
+    new_entries = []
+    source = os.path.join(SOURCE, "")
+    with PlanWriter(OUTPUT, PLAN_FILES) as writer:
+        for chunk in chunked(planned.filter_new(entries)):
+            for (relpath, _, _), key in zip(chunk, s3_keys([entry[0] for entry in chunk])):
+                writer.write(f"cp {source}{relpath} s3://{BUCKET}/{key}\n")
+            new_entries.extend(chunk)
+            print(f"Planned {writer.count} files...")
 
-                    f.write(cmd)
-                    count += 1
+    # Recorded only once every plan file is written, so an interrupted run
+    # re-emits everything it didn't finish
+    planned.record(new_entries)
 
-                    if count % 50000 == 0:
-                        print(f"Found {count} videos...")
+    files = ", ".join(f"'{path}'" for path in writer.paths)
+    print(f"DONE: Generated plan for {writer.count} files ({len(planned)} planned in total) in {files}")
+
+def load_listing(listing_path):
+    """Keys from `s5cmd ls` output: the last column, relative to the bucket."""
+    bucket_prefix = f"s3://{BUCKET}/"
+    keys = set()
+    with open(listing_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[-1].endswith("/"):
+                continue
+            key = parts[-1]
+            if key.startswith(bucket_prefix):
+                key = key[len(bucket_prefix):]
+            keys.add(key)
+    return keys
+
+def verify(assets):
+    """
+    Compares local assets with a bucket listing. Assets found only under
+    their legacy MD5 key get an s5cmd mv to their id_processor key; assets
+    found under both get an rm of the legacy copy.
+    """
+    uploaded = load_listing(VERIFY_LISTING)
+    print(f"Loaded {len(uploaded)} keys from {VERIFY_LISTING}")
+    counts = Counter()
+    with open(VERIFY_OUTPUT, "w") as f:
+        for chunk in chunked(assets):
+            keys = s3_keys([relpath for _, relpath, _, _ in chunk])
+            for (item_id, relpath, _, _), key in zip(chunk, keys):
+                if item_id is None:
+                    counts["unknown id"] += 1
+                    continue
+                ext = relpath.rpartition(".")[2]
+                old = legacy_key(f"{item_id}.{ext}")
+                if old in uploaded and key in uploaded:
+                    counts["both schemes"] += 1
+                    f.write(f"rm s3://{BUCKET}/{old}\n")
+                elif old in uploaded:
+                    counts["legacy only"] += 1
+                    f.write(f"mv s3://{BUCKET}/{old} s3://{BUCKET}/{key}\n")
+                elif key in uploaded:
+                    counts["current"] += 1
+                else:
+                    counts["not uploaded"] += 1
+
+    for name in ("current", "legacy only", "both schemes", "not uploaded", "unknown id"):
+        print(f"{name:>14}: {counts[name]}")
+    print(f"DONE: Wrote {counts['legacy only'] + counts['both schemes']} fix-up commands to '{VERIFY_OUTPUT}'")
+
+def main():
+    if not os.path.exists(SOURCE):
+        print(f"Error: Source not found: {SOURCE}")
+        return
 
-    print(f"DONE: Generated plan for {count} videos in '{OUTPUT}'")
+    index_path = os.path.join(SOURCE, INDEX)
+    if VERIFY_LISTING:
+        verify(iter_local_assets(index_path))
+    else:
+        plan(index_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,8 @@
 import uuid
 import os
+import hashlib
+from functools import lru_cache
+from multiprocessing import Pool
 
 # -----------------------------------------------------------------------------
 # MOODIO GLOBAL ID PROCESSOR
@@ -11,10 +14,19 @@ import os
 # We derive a unique, stable Namespace UUID from "moodio"
 MOODIO_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, 'moodio')
 
+# SHA-1 state after hashing the namespace; every UUID v5 starts from a copy
+_NAMESPACE_SHA1 = hashlib.sha1(MOODIO_NAMESPACE.bytes)
+# Variant bits (10xx) applied to the first hex digit of the 4th group
+_VARIANT_DIGIT = {d: "89ab"[int(d, 16) & 3] for d in "0123456789abcdef"}
+# IDs per task when batches are spread over processes
+_CHUNK = 50000
+
+@lru_cache(maxsize=65536, typed=True)
 def get_global_uuid(original_id: str) -> str:
     """
     Generates a deterministic UUID v5 for any given input ID.
     Works for 20-char flim IDs, 36-char UUIDs, or any other string.
+    Recent results are memoized for repeated lookups.
     """
     if not original_id:
         raise ValueError("Original ID cannot be empty")
@@ -35,6 +47,69 @@ def get_s3_path(original_id: str, asset_type: str = "images", ext: str = "jpg")
     
     return f"{asset_type}/{shard}/{guid}.{ext}"
 
+def _uuid5_strings(original_ids):
+    """
+    uuid.uuid5(MOODIO_NAMESPACE, str(id)) as strings, without building UUID
+    objects: hashing continues from the pre-hashed namespace and the version
+    and variant bits are patched into the hex digest.
+    """
+    copy = _NAMESPACE_SHA1.copy
+    variant = _VARIANT_DIGIT
+    out = []
+    append = out.append
+    for original_id in original_ids:
+        if not original_id:
+            raise ValueError("Original ID cannot be empty")
+        h = copy()
+        h.update(str(original_id).encode("utf-8"))
+        x = h.hexdigest()
+        append(f"{x[:8]}-{x[8:12]}-5{x[13:16]}-{variant[x[16]]}{x[17:20]}-{x[20:32]}")
+    return out
+
+def _paths_chunk(args):
+    original_ids, asset_type, ext = args
+    return [f"{asset_type}/{guid[:2]}/{guid}.{ext}" for guid in _uuid5_strings(original_ids)]
+
+def _map_chunks(func, chunks, processes):
+    if processes and processes > 1 and len(chunks) > 1:
+        with Pool(processes) as pool:
+            results = pool.map(func, chunks)
+    else:
+        results = map(func, chunks)
+    return [value for result in results for value in result]
+
+def get_global_uuids(original_ids, processes: int = None) -> list:
+    """
+    Batch version of get_global_uuid; output matches it exactly, in input order.
+    With processes > 1 the work is split across that many worker processes.
+    """
+    original_ids = list(original_ids)
+    chunks = [original_ids[i:i + _CHUNK] for i in range(0, len(original_ids), _CHUNK)]
+    return _map_chunks(_uuid5_strings, chunks, processes)
+
+def get_s3_paths(original_ids, asset_type: str = "images", ext="jpg", processes: int = None) -> list:
+    """
+    Batch version of get_s3_path for building upload plans over many IDs.
+    ext is either one extension for every ID or a sequence with one per ID.
+    Returns the paths in input order.
+    """
+    original_ids = list(original_ids)
+    if not isinstance(ext, str):
+        guids = get_global_uuids(original_ids, processes)
+        return [f"{asset_type}/{guid[:2]}/{guid}.{e.lstrip('.')}" for guid, e in zip(guids, ext)]
+
+    ext = ext.lstrip('.')
+    chunks = [(original_ids[i:i + _CHUNK], asset_type, ext) for i in range(0, len(original_ids), _CHUNK)]
+    return _map_chunks(_paths_chunk, chunks, processes)
+
+def process_ids(original_ids, asset_type: str = "images", ext="jpg", processes: int = None):
+    """Returns (uuids, shards, paths) lists for a batch of IDs."""
+    guids = get_global_uuids(original_ids, processes)
+    exts = [ext.lstrip('.')] * len(guids) if isinstance(ext, str) else [e.lstrip('.') for e in ext]
+    shards = [guid[:2] for guid in guids]
+    paths = [f"{asset_type}/{shard}/{guid}.{e}" for guid, shard, e in zip(guids, shards, exts)]
+    return guids, shards, paths
+
 if __name__ == "__main__":
     # Quick test/validation
     test_id = "TSdwYwc6MkoRxpwhHRvY"
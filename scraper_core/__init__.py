@@ -0,0 +1 @@
+"""Shared building blocks for the Flim and Frameset scrapers."""
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from scraper_core.blockio import BlockWriter, borrow_buffer
+from scraper_core.metrics import default_metrics, host_of
+from scraper_core.rate_control import record_error, record_response
+from scraper_core.resumable import (
+    DownloadError, complete_from_416, finalize, part_path, plan_write, range_headers, resume_offset,
+)
+from scraper_core.segmented import SegmentedFile, check_range_response, wants_segments
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+# Same status codes the urllib3 Retry in the scrapers retries on
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class DownloadJob:
+    url: str
+    filepath: Path
+    index: int
+    total: int
+    item_id: str = None
+    size: int = 0  # bytes written, set once the job completes
+
+
+async def _write_blocks(blocks, chunks):
+    """
+    Feeds an async iterator of chunks into a BlockWriter. Chunks that only
+    fill the buffer are copied in on the event loop; the ones that complete
+    a block are handed over on a thread, where the block is written. Stops
+    early once blocks has taken its limit.
+    """
+    async for chunk in chunks:
+        if blocks.fits(len(chunk)):
+            blocks.write(chunk)
+        elif not await asyncio.to_thread(blocks.write, chunk):
+            return
+
+
+class AsyncDownloader:
+    """
+    Drives many concurrent downloads from a single event loop.
+
+    max_in_flight bounds the number of transfers running at once and
+    per_host_limit bounds open connections to any single host. on_complete
+    and on_failed, when given, are called with each job that finished
+    downloading or gave up; active counts the transfers running. Callers
+    that track completed downloads themselves can turn off the per-file
+    existence check with skip_existing=False. With a RateController, each
+    transfer also waits for a slot from the adaptive per-host limiter. With a
+    SegmentPolicy as segments, files past its threshold are fetched as
+    parallel range requests into a preallocated file. Bodies are written in
+    aligned block_size blocks from pooled buffers (scraper_core.blockio);
+    aiohttp hands over chunks as they arrive, so they are copied into the
+    buffer once rather than read into it. File I/O (opening, block writes,
+    moving files into place) runs on worker threads, so a slow disk doesn't
+    stall the sockets of every other transfer.
+    """
+
+    def __init__(self, headers=None, max_in_flight=256, per_host_limit=64,
+                 block_size=256 * 1024, timeout=30, retries=3, backoff_factor=1, on_complete=None,
+                 on_failed=None, skip_existing=True, controller=None, segments=None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async engine (pip install aiohttp)")
+        self.headers = {k: v for k, v in (headers or {}).items() if v is not None}
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.block_size = block_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.on_complete = on_complete
+        self.on_failed = on_failed
+        self.skip_existing = skip_existing
+        self.controller = controller
+        self.segments = segments
+        self.stats = {"downloaded": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        self.active = 0
+
+    def run(self, jobs):
+        """
+        Downloads every job and returns the run stats.
+        jobs may be a list or any blocking iterable (e.g. fed by a queue).
+        """
+        return asyncio.run(self._run(jobs))
+
+    async def _run(self, jobs):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_in_flight,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+
+        def on_done(task):
+            tasks.discard(task)
+            self.active = len(tasks)
+            slots.release()
+
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as client:
+            async for job in self._iter_jobs(jobs):
+                await slots.acquire()
+                task = asyncio.create_task(self._download(client, job))
+                tasks.add(task)
+                self.active = len(tasks)
+                task.add_done_callback(on_done)
+            if tasks:
+                await asyncio.gather(*tasks)
+        return self.stats
+
+    async def _iter_jobs(self, jobs):
+        if isinstance(jobs, (list, tuple)):
+            for job in jobs:
+                yield job
+            return
+
+        # Blocking iterables are advanced off the event loop
+        loop = asyncio.get_running_loop()
+        it = iter(jobs)
+        while True:
+            job = await loop.run_in_executor(None, next, it, None)
+            if job is None:
+                return
+            yield job
+
+    async def _download(self, client, job):
+        if self.skip_existing and await asyncio.to_thread(job.filepath.exists):
+            self.stats["skipped"] += 1
+            return
+
+        limiter = self.controller.limiter_for(job.url) if self.controller else None
+        if limiter:
+            await limiter.acquire_async()
+        try:
+            await self._transfer(client, job, limiter)
+        except Exception as e:
+            # Anything unexpected fails this job only, not the whole run
+            logger.error(f"[{job.index}/{job.total}] Error: {job.filepath.name} - {e}")
+            self._fail(job)
+        finally:
+            if limiter:
+                limiter.release()
+
+    async def _transfer(self, client, job, limiter):
+        part = part_path(job.filepath)
+        for attempt in range(self.retries + 1):
+            offset = await asyncio.to_thread(resume_offset, part)
+            try:
+                start = time.monotonic()
+                async with client.get(job.url, headers=range_headers(offset)) as response:
+                    if limiter:
+                        record_response(limiter, response.status, time.monotonic() - start,
+                                        response.headers.get("Retry-After"))
+                    if response.status == 416 and offset:
+                        if await asyncio.to_thread(complete_from_416, response.headers, part, job.filepath, offset):
+                            self._complete(job, 0)
+                            return
+                        continue
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        default_metrics.record_retry(host_of(job.url))
+                        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        continue
+                    write_offset, total = plan_write(response.status, response.headers, offset)
+                    if (self.segments and not write_offset
+                            and wants_segments(response.headers, total, self.segments.threshold)):
+                        seg = await asyncio.to_thread(SegmentedFile, job.filepath, part, total,
+                                                      self.segments.segment_size)
+                        try:
+                            written = await self._fetch_segments(client, job, response, seg)
+                            await asyncio.to_thread(seg.commit)
+                        finally:
+                            await asyncio.to_thread(seg.close)
+                        self._complete(job, written)
+                        return
+                    f = await asyncio.to_thread(open, part, 'ab' if write_offset else 'wb')
+                    try:
+                        with borrow_buffer(self.block_size) as buffer:
+                            blocks = BlockWriter(f.write, buffer, write_offset)
+                            await _write_blocks(blocks, response.content.iter_any())
+                            await asyncio.to_thread(blocks.flush)
+                    finally:
+                        await asyncio.to_thread(f.close)
+                    written = blocks.written
+                await asyncio.to_thread(finalize, part, job.filepath, total)
+                self._complete(job, written)
+                return
+            except DownloadError as e:
+                if e.status is None and attempt < self.retries:
+                    default_metrics.record_retry(host_of(job.url))
+                    continue
+                logger.error(f"[{job.index}/{job.total}] Failed {e}: {job.filepath.name}")
+                self._fail(job)
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if limiter:
+                    record_error(limiter)
+                # The .part file is kept, so the next attempt resumes from it
+                if attempt < self.retries:
+                    default_metrics.record_retry(host_of(job.url))
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    continue
+                logger.error(f"[{job.index}/{job.total}] Error: {job.filepath.name} - {e}")
+                self._fail(job)
+                return
+        # Retries ran out on a 416 that didn't prove the file complete
+        logger.error(f"[{job.index}/{job.total}] Failed after {self.retries + 1} attempts: {job.filepath.name}")
+        self._fail(job)
+
+    async def _fetch_segments(self, client, job, response, seg):
+        # Segment 0 keeps streaming from response; the rest run as ranged GETs
+        policy = self.segments
+        slots = asyncio.Semaphore(policy.workers)
+
+        async def copy(content, index):
+            with borrow_buffer(policy.buffer_size) as buffer:
+                writer = seg.segment(index, buffer)
+                await _write_blocks(writer, content.iter_any())
+                await asyncio.to_thread(writer.close)
+
+        async def fetch(index):
+            start, end = seg.ranges[index]
+            async with slots:
+                headers = {"Accept-Encoding": "identity", "Range": f"bytes={start}-{end}"}
+                async with client.get(job.url, headers=headers) as ranged:
+                    check_range_response(ranged.status, ranged.headers, start, end)
+                    await copy(ranged.content, index)
+
+        tasks = [asyncio.create_task(fetch(index)) for index in range(1, len(seg.ranges))]
+        try:
+            await copy(response.content, 0)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return seg.total
+
+    def _complete(self, job, written):
+        self.stats["downloaded"] += 1
+        self.stats["bytes"] += written
+        job.size = written
+        if self.on_complete:
+            self.on_complete(job)
+        logger.info(f"[{job.index}/{job.total}] Downloaded: {job.filepath.name}")
+
+    def _fail(self, job):
+        self.stats["failed"] += 1
+        if self.on_failed:
+            self.on_failed(job)
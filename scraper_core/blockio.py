@@ -0,0 +1,187 @@
+import threading
+from contextlib import contextmanager
+
+# -----------------------------------------------------------------------------
+# Large-block copy of response bodies. iter_content() allocates a new bytes
+# object per chunk and each one becomes its own write() call, which at
+# hundreds of MB/s costs more CPU than the transfer itself. Here a body is
+# read straight into a reusable buffer (readinto on the socket where the
+# response allows it) and leaves it in whole blocks, aligned to block
+# boundaries of the destination file. Buffers come from process-wide pools,
+# so steady-state downloads allocate nothing per chunk.
+# See benchmarks/bench_blockio.py for CPU time per GB against iter_content.
+# -----------------------------------------------------------------------------
+
+BLOCK_SIZE = 1024 * 1024
+# Block sizes are rounded to the page size so aligned writes stay aligned
+ALIGNMENT = 4096
+
+
+class BufferPool:
+    """
+    Reusable bytearrays of one size. With count set, acquire() blocks while
+    all of them are in use, which bounds memory at count * size no matter
+    how many transfers run at once; without it, the pool grows to the peak
+    number in use and stays there.
+    """
+
+    def __init__(self, size, count=None):
+        self.size = size
+        self.count = count
+        self._free = []
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while not self._free and self.count is not None and self._created >= self.count:
+                self._cond.wait()
+            if self._free:
+                return self._free.pop()
+            self._created += 1
+        return bytearray(self.size)
+
+    def release(self, buffer):
+        with self._cond:
+            self._free.append(buffer)
+            self._cond.notify()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+@contextmanager
+def borrow_buffer(size=BLOCK_SIZE):
+    """A buffer of at least size bytes (rounded up to ALIGNMENT) from the shared pool."""
+    size = -(-size // ALIGNMENT) * ALIGNMENT
+    with _pools_lock:
+        pool = _pools.get(size)
+        if pool is None:
+            pool = _pools[size] = BufferPool(size)
+    buffer = pool.acquire()
+    try:
+        yield buffer
+    finally:
+        pool.release(buffer)
+
+
+class BlockWriter:
+    """
+    Collects a stream in buffer and passes write() whole blocks as
+    memoryviews of it, valid only until write() returns. offset is where the
+    stream starts in the destination: the first block stops at the next
+    multiple of the buffer size, so every later write is aligned. With
+    limit, only the first limit bytes are kept and write() returns False
+    once they are in.
+    """
+
+    def __init__(self, write, buffer, offset=0, limit=None):
+        self._write = write
+        self.view = memoryview(buffer)
+        self.size = len(self.view)
+        self.filled = 0
+        self.end = self.size - offset % self.size
+        self.remaining = limit
+        self.written = 0
+
+    def _space(self):
+        space = self.end - self.filled
+        return space if self.remaining is None else min(space, self.remaining)
+
+    def _took(self, n):
+        if self.remaining is not None:
+            self.remaining -= n
+
+    def fits(self, size):
+        """Whether size more bytes would only be copied into the buffer, without a write()."""
+        return size < self._space()
+
+    def write(self, chunk):
+        chunk = memoryview(chunk)
+        while chunk and self.remaining != 0:
+            space = self._space()
+            n = min(len(chunk), space)
+            if not self.filled and n == space:
+                # A whole block on its own: write it without the copy
+                self._write(chunk[:n])
+                self.written += n
+                self.end = self.size
+                self._took(n)
+            else:
+                self.view[self.filled:self.filled + n] = chunk[:n]
+                self._filled(n)
+            chunk = chunk[n:]
+        return self.remaining != 0
+
+    def fill_from(self, readinto):
+        """Reads once with readinto straight into the buffer; returns the bytes read (0 at the end)."""
+        space = self._space()
+        if not space:
+            return 0
+        n = readinto(self.view[self.filled:self.filled + space])
+        if n:
+            self._filled(n)
+        return n or 0
+
+    def _filled(self, n):
+        self.filled += n
+        self._took(n)
+        if self.filled == self.end:
+            self.flush()
+            self.end = self.size
+
+    def flush(self):
+        if self.filled:
+            self._write(self.view[:self.filled])
+            self.written += self.filled
+            self.filled = 0
+
+
+def socket_readinto(response):
+    """
+    readinto() of the http.client response under a requests response whose
+    body needs no decoding, so reads land in the caller's buffer without an
+    intermediate bytes object; None for anything else (HTTP/2, compressed
+    bodies, a body already partly read).
+    """
+    raw = getattr(response, "raw", None)
+    fp = getattr(raw, "_fp", None)
+    if fp is None or not hasattr(fp, "readinto") or getattr(raw, "_fp_bytes_read", 1):
+        return None
+    if response.headers.get("Content-Encoding", "identity").lower() not in ("", "identity"):
+        return None
+    return fp.readinto
+
+
+def release_if_done(response):
+    """
+    Returns the connection of a body read through socket_readinto() to the
+    pool once it was read to the end; requests would otherwise close it,
+    since it can't tell the body was consumed.
+    """
+    raw = response.raw
+    if raw._fp.isclosed():
+        raw.release_conn()
+
+
+def copy_body(response, blocks, chunk_size=None):
+    """
+    Streams a requests-style response body into a BlockWriter until the
+    body ends or the writer's limit is reached. Reads go straight into the
+    writer's buffer when socket_readinto() allows it and otherwise come from
+    iter_content() in chunk_size pieces (default: the buffer size). Flushes
+    the writer and returns the bytes it has written in total.
+    """
+    readinto = socket_readinto(response)
+    if readinto is not None:
+        while blocks.fill_from(readinto):
+            pass
+        blocks.flush()
+        release_if_done(response)
+        return blocks.written
+    for chunk in response.iter_content(chunk_size=chunk_size or blocks.size):
+        if not blocks.write(chunk):
+            break
+    blocks.flush()
+    return blocks.written
@@ -0,0 +1,100 @@
+import argparse
+import logging
+from functools import partial
+from pathlib import Path
+
+from scraper_core.engine import run_sources
+from scraper_core.shards import parse_shard_spec
+from scraper_core.sinks import SINKS, build_partition_sink, build_sink
+from scraper_core.sources import SOURCES
+from scraper_core.sources.auth import read_credentials
+from scraper_core.workers import build_source
+
+# -----------------------------------------------------------------------------
+# Single entry point for every source. Several sources run concurrently in one
+# process and share the adaptive rate controller:
+#   python -m scraper_core flim-video flim-still frameset --target-count 500
+# Credentials come from FLIM_AUTH_TOKEN and FRAMESET_COOKIE_STRING. --sink
+# picks where assets go (see scraper_core/sinks.py); --metrics-port serves
+# Prometheus metrics while the run lasts (see scraper_core/metrics.py). Runs
+# are incremental (see scraper_core/crawl.py) unless --full-crawl is given;
+# --shard-by splits a search into concurrent sub-queries (scraper_core/shards.py).
+# --processes downloads in that many worker processes per source, spreading
+# the credentials listed one per line in FLIM_AUTH_TOKENS and
+# FRAMESET_COOKIE_STRINGS over them (scraper_core/workers.py).
+# -----------------------------------------------------------------------------
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scraper_core", description="Scrape one or more sources.")
+    parser.add_argument("sources", nargs="+", choices=sorted(SOURCES), help="sources to run")
+    parser.add_argument("--target-count", type=int, help="new items to fetch per source (default: per source)")
+    parser.add_argument("--output-root", type=Path, default=Path("."),
+                        help="directory holding each source's default output folder")
+    parser.add_argument("--workers", type=int, help="download workers per source (default: per source)")
+    parser.add_argument("--sink", choices=list(SINKS), default="sharded",
+                        help="where assets go: sharded or flat (local) folders, tar shards, or S3 (default: sharded)")
+    parser.add_argument("--shard-size-mb", type=int, default=1024, help="tar shard size for --sink tar (default: 1024)")
+    parser.add_argument("--s3-bucket", help="bucket for --sink s3 (needs boto3)")
+    parser.add_argument("--s3-endpoint-url", help="endpoint of an S3-compatible store such as MinIO")
+    parser.add_argument("--full-crawl", action="store_true",
+                        help="crawl from the first page instead of picking up where earlier runs left off")
+    parser.add_argument("--stop-after-pages", type=int, default=3,
+                        help="end the new-results crawl after this many pages with nothing new (default: 3)")
+    parser.add_argument("--shard-by", action="append", default=[], metavar="FILTER=VALUE,...",
+                        help="split the search into one sub-query per value (repeat for more filters; "
+                             "join values with | to share a sub-query). Flim only")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="download processes per source, each with its own connection pool and credential; "
+                             "--workers applies per process (default: 1)")
+    parser.add_argument("--report-interval", type=float, default=10,
+                        help="seconds between progress reports, 0 to turn them off (default: 10)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--metrics-addr", default="127.0.0.1", help="address for --metrics-port (default: 127.0.0.1)")
+    parser.add_argument("--summary", type=Path,
+                        help="write the JSON run summary here (default: _run_summary.json in each output folder)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        shard_by = parse_shard_spec(args.shard_by)
+    except ValueError as e:
+        parser.error(f"--shard-by: {e}")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+
+    sources = []
+    for name in dict.fromkeys(args.sources):
+        source_cls = SOURCES[name]
+        options = {}
+        if args.target_count is not None:
+            options["target_count"] = args.target_count
+        if args.workers is not None:
+            options["download_workers"] = args.workers
+        if shard_by:
+            unknown = ", ".join(sorted(set(shard_by) - set(source_cls.shard_filters)))
+            if not unknown:
+                options["shard_by"] = shard_by
+            elif len(args.sources) == 1:
+                parser.error(f"{name} can't shard on {unknown}")
+            else:
+                logging.warning(f"{name} can't shard on {unknown}; it runs a single query")
+        folder = args.output_root / source_cls.default_folder
+        sink_options = dict(bucket=args.s3_bucket, endpoint_url=args.s3_endpoint_url,
+                            shard_size=args.shard_size_mb * 1024 * 1024)
+        options.update(output_folder=folder, incremental=not args.full_crawl, stop_after_pages=args.stop_after_pages)
+        credentials = read_credentials(source_cls.credentials_env)
+        if args.processes == 1 and len(credentials) > 1:
+            logging.warning(f"{name}: only the first of {len(credentials)} credentials in "
+                            f"{source_cls.credentials_env} is used without --processes")
+        sources.append(build_source(source_cls, args.processes, credentials,
+                                    sink=build_sink(args.sink, folder, **sink_options),
+                                    partition_sink=partial(build_partition_sink, args.sink, folder, **sink_options),
+                                    **options))
+
+    run_sources(sources, report_interval=args.report_interval, metrics_port=args.metrics_port,
+                metrics_addr=args.metrics_addr, summary_path=args.summary)
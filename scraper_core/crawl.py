@@ -0,0 +1,167 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+from scraper_core.pipeline import paginate
+
+logger = logging.getLogger(__name__)
+
+
+# Ids from the top of the first page kept as the high-water mark; any one of
+# them turning up ends the head, so a few deleted items don't hide the mark
+HIGH_WATER_IDS = 10
+
+
+class PageError(Exception):
+    pass
+
+
+class CrawlState:
+    """
+    What earlier runs of a source learned about its search results, kept in
+    a small JSON file next to the metadata: the high-water mark (ids of the
+    newest items when the last complete run started), the deepest page whose
+    new items were all stored, and whether the last run's head was cut short.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.high_water = []
+        self.deepest_page = None
+        self.interrupted = False
+        self.runs = 0
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.high_water = data.get("high_water", [])
+            self.deepest_page = data.get("deepest_page")
+            self.interrupted = data.get("interrupted", False)
+            self.runs = data.get("runs", 0)
+        except Exception as e:
+            logger.warning(f"Could not load crawl state: {e}")
+
+    def save(self):
+        data = {"high_water": self.high_water, "deepest_page": self.deepest_page, "interrupted": self.interrupted,
+                "runs": self.runs, "updated": int(time.time())}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        tmp_path.replace(self.path)
+
+
+class IncrementalCrawl:
+    """
+    Crawls only what earlier runs haven't seen, in two phases, each fetching
+    pages through paginate()'s sliding window of `window` requests:
+
+    1. Head: from first_page down to the high-water mark, so everything added
+       since the last run is picked up. It also ends after stop_after
+       consecutive pages with nothing new, or at the end of the results. The
+       head is not capped by the target; missing part of it would leave a
+       gap no later run revisits.
+    2. Backfill: continues below the deepest page an earlier run stored, until
+       remaining() reaches zero or the results run out.
+
+    A run with no state is a plain crawl from first_page until remaining()
+    reaches zero.
+    fetch_page returns None for a page that failed; that ends the run, and
+    if the head was cut short the high-water mark stays put and the next run
+    walks the head down to it without stopping on duplicate pages.
+
+    take(page, items, capped) stores a page's new items (only as many as are
+    still wanted when capped) and returns (new, taken): how many were new
+    and how many it stored. remaining() is how many more items are wanted;
+    several crawls sharing it (one per shard of a search) stop together.
+    """
+
+    def __init__(self, fetch_page, state, item_id, first_page=1, window=4, stop_after=3, log=None):
+        self.fetch_page = fetch_page
+        self.state = state
+        self.item_id = item_id
+        self.first_page = first_page
+        self.window = window
+        self.stop_after = stop_after
+        self.log = log or logger
+        self.pages_fetched = 0
+
+    def _fetch(self, page):
+        items = self.fetch_page(page)
+        if items is None:
+            raise PageError(f"Page {page} failed")
+        return items
+
+    def _pages(self, first_page):
+        for page, items in paginate(self._fetch, first_page=first_page, window=self.window):
+            self.pages_fetched += 1
+            yield page, items
+
+    def run(self, take, remaining):
+        """Returns the number of new items taken."""
+        state = self.state
+        first_run = not state.high_water
+        high_water = set(state.high_water)
+        found = 0
+        top = None
+        last_head_page = None
+        head_done = False
+        try:
+            duplicate_pages = 0
+            for page, items in self._pages(self.first_page):
+                last_head_page = page
+                ids = [self.item_id(item) for item in items]
+                if top is None:
+                    top = ids[:HIGH_WATER_IDS]
+                new, taken = take(page, items, first_run)
+                found += taken
+                if taken == new:
+                    self._reached(page)
+                if first_run:
+                    if remaining() <= 0:
+                        break
+                    continue
+                if not high_water.isdisjoint(ids):
+                    self.log.info(f"Page {page}: reached the high-water mark from the last run.")
+                    break
+                duplicate_pages = 0 if new else duplicate_pages + 1
+                if duplicate_pages >= self.stop_after and not state.interrupted:
+                    self.log.info(f"Page {page}: {duplicate_pages} pages in a row with nothing new.")
+                    break
+            head_done = True
+
+            if not first_run and remaining() > 0 and state.deepest_page is not None and last_head_page is not None:
+                # Items added at the head push older ones down, so the first
+                # backfilled pages may repeat a little; none are skipped
+                start = max(state.deepest_page, last_head_page) + 1
+                self.log.info(f"Backfilling from page {start} (deepest page so far)...")
+                for page, items in self._pages(start):
+                    new, taken = take(page, items, True)
+                    found += taken
+                    if taken == new:
+                        self._reached(page)
+                    if remaining() <= 0:
+                        break
+        except PageError as e:
+            self.log.warning(f"{e}; stopping the crawl here.")
+        finally:
+            # A first run covers everything from the top down to deepest_page
+            # even when cut short, so its top is a valid mark
+            if top is not None and (head_done or first_run):
+                state.high_water = top
+                state.interrupted = False
+            elif top is not None:
+                state.interrupted = True
+            state.runs += 1
+            state.save()
+        self.log.info(f"Incremental crawl: {self.pages_fetched} pages fetched, deepest page {state.deepest_page}.")
+        return found
+
+    def _reached(self, page):
+        if self.state.deepest_page is None or page > self.state.deepest_page:
+            self.state.deepest_page = page
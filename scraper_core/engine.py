@@ -0,0 +1,549 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+from id_processor import get_global_uuid, get_global_uuids, get_s3_path
+from scraper_core.async_download import AsyncDownloader, DownloadJob, aiohttp
+from scraper_core.crawl import CrawlState, IncrementalCrawl
+from scraper_core.id_index import IdIndex
+from scraper_core.metadata_store import MetadataStore
+from scraper_core.metrics import LiveReport, default_metrics, serve_metrics
+from scraper_core.pipeline import ItemQueue, paginate, start_producer
+from scraper_core.rate_control import default_controller
+from scraper_core.resumable import DownloadError
+from scraper_core.shards import plan_shards
+from scraper_core.sinks import LocalSink, ShardedLocalSink, download_to_sink
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_NAME = "_run_summary.json"
+
+
+@dataclass
+class Attempt:
+    url: str
+    filename: str  # path relative to the output folder
+
+
+class Source:
+    """
+    Adapter for one site and asset type.
+
+    Subclasses describe how to authenticate, fetch a page of metadata and
+    where an item's asset lives; the Engine does the rest (metadata store, id
+    index, streaming pipeline, resume, download engines, rate control).
+    keep, when a subclass defines it, filters which records are stored.
+
+    Assets are written through a storage sink (scraper_core.sinks). By
+    default that is the output folder, in the upload layout
+    `{asset_type}/{shard}/{uuid}.{ext}` from id_processor, or in a flat
+    `{id}.{ext}` folder without sharded_layout. A sink passed in (tar shards,
+    S3, ...) decides the layout itself; metadata and the id index always stay
+    in the output folder.
+
+    With incremental, each run only crawls what earlier runs haven't seen
+    (scraper_core.crawl): new results down to the last run's high-water mark
+    or stop_after_pages pages with nothing new, then deeper pages from where
+    earlier runs stopped.
+
+    Sources listing shard_filters can split their search with shard_by
+    ({filter: [values]}, see scraper_core.shards) into sub-queries that are
+    crawled concurrently, each with its own crawl state; fetch_page then
+    takes the Shard as a keyword argument.
+
+    credential_option names the constructor argument holding the source's
+    credential and credentials_env an environment variable listing several,
+    one per line, for multi-process runs to spread over (scraper_core.workers).
+
+    asset_extensions lists the extensions the source's assets are saved
+    under; the first run against an existing folder only counts those files
+    as downloads.
+    """
+
+    name = "source"
+    label = "items"
+    asset_type = "assets"
+    default_folder = None
+    first_page = 1
+    page_size = None
+    keep = None
+    # Filters the search can be sharded on, and those it can also exclude
+    shard_filters = ()
+    remainder_filters = ()
+    credential_option = None
+    credentials_env = None
+    asset_extensions = ()
+
+    def __init__(self, output_folder=None, target_count=1000, download_workers=8, metadata_workers=4,
+                 queue_size=1000, engine="threads", max_in_flight=256, per_host_limit=64,
+                 sharded_layout=True, sink=None, segments=None, incremental=False, stop_after_pages=3,
+                 shard_by=None):
+        self.output_folder = Path(output_folder or self.default_folder)
+        self.target_count = target_count
+        self.download_workers = download_workers
+        self.metadata_workers = metadata_workers
+        self.queue_size = queue_size
+        self.engine = engine
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        if sink is None:
+            sink = (ShardedLocalSink if sharded_layout else LocalSink)(self.output_folder)
+        self.sink = sink
+        self.sharded_layout = sink.sharded
+        # SegmentPolicy for large files, or None for one stream per file
+        self.segments = segments
+        self.incremental = incremental
+        self.stop_after_pages = stop_after_pages
+        self.log = _SourceLogger(logger, {"source": self.name})
+        self.shards = []
+        if shard_by:
+            unknown = set(shard_by) - set(self.shard_filters)
+            if unknown:
+                raise ValueError(f"{self.name} can't shard on {', '.join(sorted(unknown))}")
+            self.shards = plan_shards(shard_by, self.remainder_filters)
+
+    def check_auth(self):
+        """Returns False (after logging why) when the run can't start."""
+        return True
+
+    def fetch_page(self, page):
+        """Returns the page's items, [] past the last page, or None when the request failed."""
+        raise NotImplementedError
+
+    def page_fetcher(self, shard=None):
+        """fetch_page for one shard of the search, or the whole search."""
+        return self.fetch_page if shard is None else partial(self.fetch_page, shard=shard)
+
+    def iter_pages(self):
+        """Yields (page, items); the engine stops iterating once it has target_count new items."""
+        return paginate(self.fetch_page, first_page=self.first_page, window=self.metadata_workers,
+                        limit=self.target_count, page_size=self.page_size)
+
+    def item_id(self, item):
+        return item.get("id")
+
+    def is_downloadable(self, item):
+        return True
+
+    def attempts(self, item, item_id):
+        """Returns the Attempts to try in order; the first one that succeeds wins."""
+        raise NotImplementedError
+
+    def asset_path(self, item_id, ext, asset_type=None):
+        if self.sharded_layout:
+            return get_s3_path(item_id, asset_type or self.asset_type, ext)
+        return f"{item_id}.{ext}"
+
+    def session_for(self, url):
+        return self.session
+
+    def download_options(self):
+        """Extra keyword arguments for download_to_sink()."""
+        return {"segments": self.segments}
+
+    def async_headers(self):
+        """Headers for the async engine; sources that return None only run on threads."""
+        return None
+
+    def record_result(self, item, tried, attempt):
+        """Called after each item with the number of attempts made and the winning one (or None)."""
+
+    def start_worker(self, partition):
+        """
+        Called in each worker process of a multi-process run before its
+        downloads start. record_result() calls also reach the coordinator's
+        source, which keeps any state saved on close(); workers must not.
+        """
+
+    def close(self):
+        pass
+
+
+class _SourceLogger(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        return f"[{self.extra['source']}] {msg}", kwargs
+
+
+class Engine:
+    """
+    Runs one Source: pages stream into a bounded queue that download workers
+    drain while later pages are still being fetched. Metadata is appended per
+    page, and downloads queued by a crashed run are resumed first.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.log = source.log
+        self.folder = source.output_folder
+        self.metadata_store = MetadataStore(self.folder, keep=source.keep)
+        self.id_index = IdIndex(self.folder / "_index.sqlite")
+        self.stats = {"queued": 0, "downloaded": 0, "skipped": 0, "failed": 0}
+        self.metrics = default_metrics
+        self.active = 0
+        self._stats_lock = threading.Lock()
+        # Ids a crashed run queued but never finished; only these may
+        # already be stored without the index knowing
+        self._resumed = set()
+
+    def load_existing_metadata(self):
+        try:
+            if self.id_index.is_empty():
+                # One-time bootstrap; later runs read ids from the index only
+                stored_ids = self.metadata_store.load_ids()
+                self.id_index.mark_seen(stored_ids)
+                uuid_to_id = None
+                if self.source.sharded_layout:
+                    stored_ids = [item_id for item_id in stored_ids if item_id]
+                    uuid_to_id = dict(zip(get_global_uuids(stored_ids), stored_ids))
+                self.id_index.seed_downloads(self.folder, uuid_to_id, self.source.asset_extensions)
+            ids = self.id_index.seen_ids()
+            if ids:
+                self.log.info(f"Loaded {len(ids)} existing {self.source.label} from metadata")
+            return ids
+        except Exception as e:
+            self.log.warning(f"Could not load existing metadata: {e}")
+        return set()
+
+    def save_metadata(self, new_items, existing_ids):
+        new_items = [item for item in new_items if self.source.item_id(item) not in existing_ids]
+        self.metadata_store.append(new_items)
+        ids = [self.source.item_id(item) for item in new_items]
+        self.id_index.mark_seen(ids)
+        existing_ids.update(ids)
+        return len(new_items)
+
+    def resume_unfinished(self, downloads):
+        unfinished = self.id_index.unfinished_ids()
+        if not unfinished:
+            return
+        self._resumed = unfinished
+        self.log.info(f"Resuming {len(unfinished)} unfinished downloads from a previous run...")
+        for item in self.metadata_store.iter_items():
+            if self.source.item_id(item) in unfinished:
+                downloads.put(item)
+
+    def fetch_metadata(self, existing_ids, on_new_items):
+        source = self.source
+        seen_ids = set(existing_ids)
+        found = 0
+        lock = threading.Lock()
+
+        def remaining():
+            return source.target_count - found
+
+        def take(log, page, items, capped=True):
+            nonlocal found
+            self.metrics.record_page(source.name, len(items))
+            # Dedup as pages arrive so downloads can start right away; shards
+            # of one search take pages concurrently and may overlap
+            with lock:
+                new_batch = []
+                page_ids = set()
+                for item in items:
+                    item_id = source.item_id(item)
+                    if item_id not in seen_ids and item_id not in page_ids:
+                        page_ids.add(item_id)
+                        new_batch.append(item)
+                taken = new_batch[:max(0, remaining())] if capped else new_batch
+                seen_ids.update(source.item_id(item) for item in taken)
+                found += len(taken)
+                if taken:
+                    log.info(f"Page {page}: Found {len(taken)} new items.")
+                    on_new_items(taken)
+            return len(new_batch), len(taken)
+
+        def crawl(shard, window):
+            log = self.log if shard is None else _SourceLogger(logger, {"source": f"{source.name} {shard.key}"})
+            fetch_page = source.page_fetcher(shard)
+            if source.incremental:
+                name = "_crawl_state.json" if shard is None else f"_crawl_state.{shard.slug}.json"
+                IncrementalCrawl(fetch_page, CrawlState(self.folder / name), source.item_id,
+                                 first_page=source.first_page, window=window, stop_after=source.stop_after_pages,
+                                 log=log).run(partial(take, log), remaining)
+                return
+            pages = source.iter_pages() if shard is None else paginate(fetch_page, source.first_page, window)
+            for page, items in pages:
+                take(log, page, items)
+                if remaining() <= 0:
+                    break
+
+        if not source.shards:
+            crawl(None, source.metadata_workers)
+        else:
+            # Shards share the METADATA_WORKERS page requests between them
+            workers = min(len(source.shards), source.metadata_workers)
+            window = max(1, source.metadata_workers // workers)
+            self.log.info(f"Crawling {len(source.shards)} search shards, {workers} at a time...")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(crawl, shard, window) for shard in source.shards]
+                for future in futures:
+                    future.result()
+
+        self.log.info(f"Metadata fetch complete. Found {found} new unique items.")
+        return found
+
+    def download_item(self, item, index, total):
+        source = self.source
+        item_id = source.item_id(item) or f"unknown_{index}"
+        if self.is_downloaded(item_id):
+            return
+
+        attempts = source.attempts(item, item_id)
+        if not attempts or self.already_stored(item_id, attempts):
+            return
+
+        error = f"Failed to download {item_id}"
+        tried = 0
+        for attempt in attempts:
+            tried += 1
+            try:
+                result = download_to_sink(source.session_for(attempt.url), attempt.url, source.sink,
+                                          attempt.filename, item, **source.download_options())
+            except DownloadError as e:
+                error = f"Failed {e}: {attempt.filename}"
+                continue
+            except Exception as e:
+                error = f"Error: {attempt.filename} - {e}"
+                continue
+            if result is None:
+                continue
+            written, location = result
+            self.mark_downloaded(item_id, location)
+            self.record_result(item, tried, attempt)
+            self._count("downloaded")
+            self.metrics.record_download(source.name, written)
+            self.log.info(f"[{index}/{total}] Downloaded: {attempt.filename}")
+            return
+
+        self.record_result(item, tried, None)
+        self._count("failed")
+        self.metrics.record_failure(source.name)
+        self.log.error(f"[{index}/{total}] {error}")
+
+    def record_result(self, item, tried, attempt):
+        self.source.record_result(item, tried, attempt)
+
+    def is_downloaded(self, item_id):
+        return self.id_index.is_downloaded(item_id)
+
+    def already_stored(self, item_id, attempts):
+        """
+        Marks an item whose asset the sink already has as downloaded, for
+        files a crashed run finished before the index recorded them. Only
+        resumed items are looked up; for the rest the index (seeded from
+        the folder on the first run) already says what is stored.
+        """
+        if item_id not in self._resumed:
+            return False
+        for attempt in attempts:
+            location = self.source.sink.exists(attempt.filename)
+            if location:
+                self.mark_downloaded(item_id, location)
+                self._count("skipped")
+                return True
+        return False
+
+    def mark_downloaded(self, item_id, filename):
+        uuid = get_global_uuid(item_id) if self.source.sharded_layout else None
+        self.id_index.mark_downloaded(item_id, filename, uuid)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def download_worker(self, downloads):
+        for index, item in downloads:
+            self._count_active(1)
+            try:
+                self.download_item(item, index, downloads.queued)
+            except Exception as e:
+                self._item_failed(index, downloads.queued, e)
+            finally:
+                self._count_active(-1)
+        # Marks of the last downloads are committed before the worker goes
+        self.id_index.flush()
+
+    def _item_failed(self, index, total, error):
+        # An item that breaks outside its download attempts fails on its
+        # own; the worker (or async run) goes on with the rest
+        self._count("failed")
+        self.metrics.record_failure(self.source.name)
+        self.log.error(f"[{index}/{total}] Error: {error}")
+
+    def _count_active(self, delta):
+        with self._stats_lock:
+            self.active += delta
+
+    def download_async(self, downloads):
+        source = self.source
+
+        def on_complete(job):
+            self.mark_downloaded(job.item_id, job.filepath.relative_to(source.sink.folder).as_posix())
+            self.metrics.record_download(source.name, job.size)
+
+        def job_for(index, item):
+            item_id = source.item_id(item) or f"unknown_{index}"
+            if self.is_downloaded(item_id):
+                return None
+            attempts = source.attempts(item, item_id)
+            if not attempts or self.already_stored(item_id, attempts):
+                return None
+            filepath = source.sink.path_for(attempts[0].filename)
+            return DownloadJob(attempts[0].url, filepath, index, downloads.queued, item_id)
+
+        def jobs():
+            for index, item in downloads:
+                try:
+                    job = job_for(index, item)
+                except Exception as e:
+                    self._item_failed(index, downloads.queued, e)
+                    continue
+                if job is not None:
+                    yield job
+
+        downloader = AsyncDownloader(
+            headers=source.async_headers(),
+            max_in_flight=source.max_in_flight,
+            per_host_limit=source.per_host_limit,
+            on_complete=on_complete,
+            on_failed=lambda job: self.metrics.record_failure(source.name),
+            skip_existing=False,
+            controller=default_controller,
+            segments=source.segments,
+        )
+        self.metrics.gauge("active_downloads", lambda: downloader.active, source=source.name)
+        stats = downloader.run(jobs())
+        self.stats["downloaded"] += stats["downloaded"]
+        self.stats["failed"] += stats["failed"]
+        self.log.info(f"Async downloads: {stats['downloaded']} downloaded, {stats['skipped']} skipped, {stats['failed']} failed.")
+
+    def download(self, downloads):
+        """Downloads everything put on the queue until it is closed."""
+        source = self.source
+        engine = source.engine
+        if engine == "async" and (aiohttp is None or source.async_headers() is None):
+            self.log.warning("Async engine unavailable (needs aiohttp), falling back to the thread pool engine")
+            engine = "threads"
+        elif engine == "async" and not isinstance(source.sink, LocalSink):
+            self.log.info(f"{type(source.sink).__name__} runs on the thread pool engine")
+            engine = "threads"
+
+        if engine == "async":
+            self.log.info(f"Streaming downloads with {source.max_in_flight} in-flight ({source.per_host_limit} per host)...")
+            self.download_async(downloads)
+        else:
+            self.log.info(f"Streaming downloads with {source.download_workers} threads...")
+            self.metrics.gauge("active_downloads", lambda: self.active, source=source.name)
+            with ThreadPoolExecutor(max_workers=source.download_workers) as executor:
+                workers = [executor.submit(self.download_worker, downloads)
+                           for _ in range(source.download_workers)]
+                for worker in workers:
+                    worker.result()
+
+    def run(self):
+        source = self.source
+        start_time = time.time()
+        if not source.check_auth():
+            return None
+
+        try:
+            existing_ids = self.load_existing_metadata()
+            self.folder.mkdir(parents=True, exist_ok=True)
+            downloads = ItemQueue(source.queue_size)
+
+            def handle_new_items(items):
+                # Each page is appended to the metadata store as soon as it arrives
+                stored = [item for item in items if source.keep(item)] if source.keep else items
+                self.save_metadata(stored, existing_ids)
+                wanted = [item for item in items if source.is_downloadable(item)]
+                self.id_index.mark_queued(source.item_id(item) for item in wanted)
+                for item in wanted:
+                    downloads.put(item)
+
+            def collect_metadata():
+                self.resume_unfinished(downloads)
+                found = self.fetch_metadata(existing_ids, handle_new_items)
+                if found:
+                    self.log.info(f"Saved metadata. Total: {len(existing_ids)} (Added {found} new this run).")
+                    self.metadata_store.maybe_compact(unique_count=len(existing_ids))
+                else:
+                    self.log.info("No new items found.")
+
+            producer = start_producer(downloads, collect_metadata)
+            self.metrics.gauge("queue_depth", downloads.qsize, source=source.name)
+
+            self.download(downloads)
+            producer.join()
+            self.stats["queued"] = downloads.queued
+            self.log.info(f"Verified/Downloaded {downloads.queued} {source.label}.")
+            if self.stats["skipped"]:
+                self.log.info(f"{self.stats['skipped']} were already on disk from an earlier run.")
+        finally:
+            self.metrics.drop_gauges(source=source.name)
+            self.id_index.close()
+            source.close()
+            source.sink.close()
+
+        elapsed = time.time() - start_time
+        self.stats["elapsed"] = elapsed
+        self.log.info(f"Job Complete. Total time: {int(elapsed // 60)}m {int(elapsed % 60)}s")
+        return self.stats
+
+
+def run_sources(sources, report_interval=10, metrics_port=None, metrics_addr="127.0.0.1", summary_path=None):
+    """
+    Runs each source's Engine on its own thread in this process and returns
+    {name: stats}. Sources share the process-wide rate controller, so two
+    sources hitting the same host stay within one adaptive limit. An Engine
+    can be passed in place of its Source, such as a workers.Coordinator that
+    downloads in worker processes.
+
+    Progress is logged every report_interval seconds (None turns it off),
+    and with metrics_port set, Prometheus metrics are served on /metrics for
+    the length of the run. The run summary (scraper_core.metrics) is written
+    as JSON to summary_path, or to each source's output folder as
+    _run_summary.json.
+    """
+    engines = [source if isinstance(source, Engine) else Engine(source) for source in sources]
+    sources = [engine.source for engine in engines]
+    default_metrics.reset()
+    default_metrics.add_collector(default_controller.gauges)
+    server = serve_metrics(metrics_port, metrics_addr) if metrics_port is not None else None
+    report = LiveReport(default_metrics, report_interval).start() if report_interval else None
+    try:
+        results = _run_engines(engines)
+    finally:
+        if report:
+            report.stop()
+        if server:
+            server.shutdown()
+            server.server_close()
+    default_controller.log_summary()
+
+    paths = [summary_path] if summary_path else [source.output_folder / SUMMARY_NAME for source in sources]
+    for path in paths:
+        try:
+            default_metrics.write_summary(path, results=results)
+        except OSError as e:
+            logger.warning(f"Could not write run summary to {path}: {e}")
+    return results
+
+
+def _run_engines(engines):
+    if len(engines) == 1:
+        results = {engines[0].source.name: engines[0].run()}
+    else:
+        with ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="source") as executor:
+            futures = {engine.source.name: executor.submit(engine.run) for engine in engines}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"[{name}] Run failed: {e}")
+                results[name] = None
+    return results
@@ -0,0 +1,203 @@
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class IdIndex:
+    """
+    Persistent SQLite index of item ids shared by all scrapers.
+
+    Tracks independent states per id: seen (metadata stored), queued (handed
+    to a download worker) and downloaded (asset complete on disk, with its
+    path relative to the output folder and, for the sharded layout, its
+    global UUID). Queued-but-not-downloaded ids are what a crashed run left
+    unfinished. Download marks are buffered and written in batches of
+    flush_every, or after flush_interval seconds, so worker threads don't pay
+    for a commit per file and a crash loses at most the last second of marks.
+    The downloaded rows double as the upload manifest (see iter_manifest).
+    """
+
+    def __init__(self, path, flush_every=256, flush_interval=1.0):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ids ("
+                " id TEXT PRIMARY KEY,"
+                " seen INTEGER NOT NULL DEFAULT 0,"
+                " downloaded INTEGER NOT NULL DEFAULT 0,"
+                " filename TEXT,"
+                " queued INTEGER NOT NULL DEFAULT 0,"
+                " uuid TEXT"
+                ") WITHOUT ROWID"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ids)")}
+            if "queued" not in columns:
+                conn.execute("ALTER TABLE ids ADD COLUMN queued INTEGER NOT NULL DEFAULT 0")
+            if "uuid" not in columns:
+                conn.execute("ALTER TABLE ids ADD COLUMN uuid TEXT")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def is_empty(self):
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM ids LIMIT 1").fetchone() is None
+
+    def seen_ids(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT id FROM ids WHERE seen = 1")
+            return {row[0] for row in rows}
+
+    def mark_seen(self, ids):
+        rows = [(item_id,) for item_id in ids if item_id]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO ids (id, seen) VALUES (?, 1) ON CONFLICT(id) DO UPDATE SET seen = 1",
+                rows,
+            )
+            conn.commit()
+
+    def mark_queued(self, ids):
+        rows = [(item_id,) for item_id in ids if item_id]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO ids (id, queued) VALUES (?, 1) ON CONFLICT(id) DO UPDATE SET queued = 1",
+                rows,
+            )
+            conn.commit()
+
+    def unfinished_ids(self):
+        """Ids handed to download workers that never completed."""
+        with self._lock:
+            self._flush_locked()
+            rows = self._connect().execute("SELECT id FROM ids WHERE queued = 1 AND downloaded = 0")
+            return {row[0] for row in rows}
+
+    def is_downloaded(self, item_id):
+        with self._lock:
+            if item_id in self._pending:
+                return True
+            row = self._connect().execute(
+                "SELECT 1 FROM ids WHERE id = ? AND downloaded = 1", (item_id,)
+            ).fetchone()
+            return row is not None
+
+    def downloaded_filename(self, item_id):
+        with self._lock:
+            if item_id in self._pending:
+                return self._pending[item_id][0]
+            row = self._connect().execute(
+                "SELECT filename FROM ids WHERE id = ? AND downloaded = 1", (item_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def mark_downloaded(self, item_id, filename=None, uuid=None):
+        with self._lock:
+            self._pending[item_id] = (filename, uuid)
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        conn = self._connect()
+        conn.executemany(
+            "INSERT INTO ids (id, downloaded, filename, uuid) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET downloaded = 1, queued = 0, "
+            "filename = excluded.filename, uuid = excluded.uuid",
+            [(item_id, filename, uuid) for item_id, (filename, uuid) in self._pending.items()],
+        )
+        conn.commit()
+        self._pending = {}
+
+    def seed_downloads(self, folder, uuid_to_id=None, extensions=()):
+        """
+        Marks every asset already in folder as downloaded: flat `{id}.{ext}`
+        files and, with uuid_to_id, sharded `{type}/{shard}/{uuid}.{ext}`
+        ones. With extensions, other files (tar shards, notes) are left out.
+        Uses directory listings instead of one stat per item.
+        """
+        extensions = {ext.lower() for ext in extensions}
+        folder = Path(folder)
+        if not folder.exists():
+            return 0
+        rows = {}
+        pending = [(folder, "")]
+        while pending:
+            directory, prefix = pending.pop()
+            with os.scandir(directory) as scanner:
+                for entry in scanner:
+                    name = entry.name
+                    if name.startswith(("_", ".")) or name.endswith((".part", ".seg", ".tmp")):
+                        continue
+                    if entry.is_dir():
+                        pending.append((entry.path, f"{prefix}{name}/"))
+                        continue
+                    stem, dot, ext = name.rpartition(".")
+                    if not dot or (extensions and ext.lower() not in extensions):
+                        continue
+                    if prefix:
+                        item_id = uuid_to_id.get(stem) if uuid_to_id else None
+                        if item_id:
+                            rows[item_id] = (prefix + name, stem)
+                    else:
+                        rows[stem] = (name, None)
+        with self._lock:
+            self._pending.update(rows)
+            self._flush_locked()
+        logger.info(f"Indexed {len(rows)} existing downloads in {folder}")
+        return len(rows)
+
+    def iter_manifest(self):
+        """Yields (id, uuid, filename) for every downloaded asset; uuid is None for flat files."""
+        with self._lock:
+            self._flush_locked()
+            cursor = self._connect().execute(
+                "SELECT id, uuid, filename FROM ids WHERE downloaded = 1 AND filename IS NOT NULL"
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(10000)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
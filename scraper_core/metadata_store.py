@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Every line is written with "id" as its first key, so ids can be read
+# without parsing the whole record
+_ID_PREFIX = '{"id": '
+_decoder = json.JSONDecoder()
+
+
+class MetadataStore:
+    """
+    Append-only, line-delimited metadata store (one JSON object per line).
+
+    Each append is flushed and fsync'd, and a torn last line left behind by a
+    crash is dropped the next time the store is opened. The first open migrates
+    a legacy `_metadata.json` array. keep, when given, filters records during
+    migration and compaction.
+    """
+
+    def __init__(self, folder, filename="_metadata.jsonl", legacy_filename="_metadata.json",
+                 keep=None, compact_ratio=0.25):
+        self.folder = Path(folder)
+        self.path = self.folder / filename
+        self.legacy_path = self.folder / legacy_filename
+        self.keep = keep
+        self.compact_ratio = compact_ratio
+        self.line_count = 0
+        self.count = 0
+        self._lock = threading.Lock()
+        self._prepared = False
+
+    def _prepare(self):
+        if self._prepared:
+            return
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists() and self.legacy_path.exists():
+            self.migrate_legacy()
+        self._repair_tail()
+        self._prepared = True
+
+    def _repair_tail(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # Walk back to the last complete line and cut the torn record
+            pos = end
+            while pos > 0:
+                step = min(64 * 1024, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                cut = block.rfind(b"\n")
+                if cut != -1:
+                    pos += cut + 1
+                    break
+            f.truncate(pos)
+        logger.warning(f"Dropped a torn record ({end - pos} bytes) at the end of {self.path.name}")
+
+    def migrate_legacy(self):
+        """One-time conversion of a `_metadata.json` array into the line store."""
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        if self.keep:
+            items = [item for item in items if self.keep(item)]
+
+        seen = set()
+        unique = []
+        for item in items:
+            if item.get("id") not in seen:
+                seen.add(item.get("id"))
+                unique.append(item)
+
+        self._write_atomic(_encode_line(item) for item in unique)
+        self.legacy_path.rename(self.legacy_path.with_name(self.legacy_path.name + ".migrated"))
+        logger.info(f"Migrated {len(unique)} items from {self.legacy_path.name} to {self.path.name}")
+
+    def _iter_lines(self):
+        self._prepare()
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+    def iter_items(self):
+        """Streams records from disk without holding the whole store in memory."""
+        for line in self._iter_lines():
+            yield json.loads(line)
+
+    def load_ids(self):
+        """Returns the set of stored ids, reading only the id of each line."""
+        ids = set()
+        lines = 0
+        for line in self._iter_lines():
+            ids.add(_line_id(line))
+            lines += 1
+        self.line_count = lines
+        self.count = len(ids)
+        return ids
+
+    def append(self, items):
+        """Appends items as one fsync'd write; returns the number written."""
+        if not items:
+            return 0
+        data = "".join(_encode_line(item) for item in items).encode("utf-8")
+        with self._lock:
+            self._prepare()
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.line_count += len(items)
+            self.count += len(items)
+        return len(items)
+
+    def compact(self):
+        """Rewrites the store keeping the last record per id."""
+        latest = {}
+        for line in self._iter_lines():
+            latest[_line_id(line)] = line
+        lines = latest.values()
+        if self.keep:
+            lines = [line for line in lines if self.keep(json.loads(line))]
+        else:
+            lines = list(lines)
+
+        with self._lock:
+            self._write_atomic(lines)
+            removed = self.line_count - len(lines)
+            self.line_count = self.count = len(lines)
+        logger.info(f"Compacted {self.path.name}: {len(lines)} records ({removed} removed)")
+
+    def maybe_compact(self, unique_count=None):
+        """
+        Compacts when duplicates make up more than compact_ratio of the file.
+        unique_count lets callers that track ids elsewhere skip load_ids().
+        """
+        lines, unique = self.line_count, self.count
+        if unique_count is not None:
+            lines, unique = self._count_lines(), unique_count
+        if lines and (lines - unique) / lines > self.compact_ratio:
+            self.compact()
+
+    def _count_lines(self):
+        if not self.path.exists():
+            return 0
+        lines = 0
+        with open(self.path, "rb") as f:
+            while block := f.read(1024 * 1024):
+                lines += block.count(b"\n")
+        self.line_count = lines
+        return lines
+
+    def _write_atomic(self, lines):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def _encode_line(item):
+    if "id" in item and next(iter(item)) != "id":
+        item = {"id": item["id"], **item}
+    return json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def _line_id(line):
+    if line.startswith(_ID_PREFIX):
+        value, _ = _decoder.raw_decode(line, len(_ID_PREFIX))
+        return value
+    return json.loads(line).get("id")
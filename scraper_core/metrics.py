@@ -0,0 +1,438 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Run metrics. Every request that goes through the rate controller (pooled
+# sessions, the HTTP/2 client and the async engine) is recorded per host;
+# the engine records downloads, bytes and metadata pages per source and
+# registers queue depth and active download gauges. One registry per process,
+# read three ways: LiveReport logs rates every few seconds, serve_metrics()
+# exposes Prometheus text format on /metrics, and snapshot() is the JSON run
+# summary run_sources() writes at the end.
+# -----------------------------------------------------------------------------
+
+# Upper bounds in seconds of the request latency buckets (time to response
+# headers). Percentiles are interpolated within a bucket, so they are
+# accurate to about a bucket's width.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75,
+                   1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def host_of(url):
+    return urlparse(url).hostname or ""
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; constant memory however many requests a run makes."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self):
+        result = {f"p{round(q * 100)}": self.percentile(q) for q in PERCENTILES}
+        result["mean"] = self.sum / self.count if self.count else None
+        result["max"] = self.max if self.count else None
+        return result
+
+
+class _HostStats:
+    def __init__(self):
+        self.statuses = Counter()
+        self.retries = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class _SourceStats:
+    def __init__(self):
+        self.downloaded = 0
+        self.failed = 0
+        self.bytes = 0
+        self.pages = 0
+        self.items_found = 0
+
+
+class Metrics:
+    """
+    Counters, per-host latency histograms and gauges for one run.
+
+    Gauges are callables read whenever metrics are reported, registered with
+    gauge(name, fn, **labels); collectors are callables returning a list of
+    (name, labels, value) for gauges that come and go, such as per-host
+    limiter state. reset() starts a new run and keeps gauges and collectors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gauges = {}
+        self._collectors = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._start = time.monotonic()
+            self._hosts = {}
+            self._sources = {}
+
+    def elapsed(self):
+        return time.monotonic() - self._start
+
+    def _host(self, host):
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = _HostStats()
+        return stats
+
+    def _source(self, name):
+        stats = self._sources.get(name)
+        if stats is None:
+            stats = self._sources[name] = _SourceStats()
+        return stats
+
+    def record_request(self, host, status, latency=None, history=()):
+        """One response; history holds statuses urllib3 already retried."""
+        with self._lock:
+            stats = self._host(host)
+            for past_status in history:
+                stats.statuses[past_status] += 1
+            stats.retries += len(history)
+            stats.statuses[status] += 1
+            if latency is not None:
+                stats.latency.observe(latency)
+
+    def record_error(self, host):
+        """A request that failed without a response (connection error, timeout)."""
+        with self._lock:
+            self._host(host).errors += 1
+
+    def record_retry(self, host):
+        with self._lock:
+            self._host(host).retries += 1
+
+    def record_download(self, source, size):
+        with self._lock:
+            stats = self._source(source)
+            stats.downloaded += 1
+            stats.bytes += size
+
+    def record_failure(self, source):
+        with self._lock:
+            self._source(source).failed += 1
+
+    def record_page(self, source, items):
+        with self._lock:
+            stats = self._source(source)
+            stats.pages += 1
+            stats.items_found += items
+
+    def gauge(self, name, fn, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = fn
+
+    def drop_gauges(self, **labels):
+        """Removes every gauge carrying all of labels."""
+        wanted = set(labels.items())
+        with self._lock:
+            for key in [key for key in self._gauges if wanted <= set(key[1])]:
+                del self._gauges[key]
+
+    def add_collector(self, fn):
+        with self._lock:
+            if fn not in self._collectors:
+                self._collectors.append(fn)
+
+    def gauge_values(self):
+        with self._lock:
+            gauges = list(self._gauges.items())
+            collectors = list(self._collectors)
+        values = []
+        for (name, labels), fn in gauges:
+            try:
+                values.append((name, dict(labels), fn()))
+            except Exception as e:
+                logger.debug(f"Gauge {name} failed: {e}")
+        for collector in collectors:
+            values.extend(collector())
+        return values
+
+    def totals(self):
+        """(downloaded, failed, bytes) across sources."""
+        with self._lock:
+            return (sum(s.downloaded for s in self._sources.values()),
+                    sum(s.failed for s in self._sources.values()),
+                    sum(s.bytes for s in self._sources.values()))
+
+    def snapshot(self):
+        """The run so far as a JSON-serialisable dict."""
+        elapsed = self.elapsed()
+
+        def rate(n):
+            return round(n / elapsed, 3) if elapsed else None
+
+        with self._lock:
+            sources = {
+                name: {
+                    "downloaded": s.downloaded, "failed": s.failed, "bytes": s.bytes,
+                    "pages": s.pages, "items_found": s.items_found,
+                    "items_per_sec": rate(s.downloaded), "bytes_per_sec": rate(s.bytes),
+                }
+                for name, s in sorted(self._sources.items())
+            }
+            hosts = {
+                host: {
+                    "requests": sum(h.statuses.values()),
+                    "statuses": {str(status): n for status, n in sorted(h.statuses.items())},
+                    "throttled_429": h.statuses[429],
+                    "retries": h.retries,
+                    "errors": h.errors,
+                    "latency_seconds": h.latency.summary(),
+                }
+                for host, h in sorted(self._hosts.items())
+            }
+        downloaded = sum(s["downloaded"] for s in sources.values())
+        total_bytes = sum(s["bytes"] for s in sources.values())
+        return {
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "elapsed_seconds": round(elapsed, 3),
+            "downloaded": downloaded,
+            "failed": sum(s["failed"] for s in sources.values()),
+            "bytes": total_bytes,
+            "items_per_sec": rate(downloaded),
+            "bytes_per_sec": rate(total_bytes),
+            "sources": sources,
+            "hosts": hosts,
+            "gauges": [{"name": name, "labels": labels, "value": value}
+                       for name, labels, value in self.gauge_values()],
+        }
+
+    def prometheus(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP scraper_{name} {help_text}")
+            lines.append(f"# TYPE scraper_{name} {kind}")
+
+        def sample(name, labels, value):
+            lines.append(f"scraper_{name}{_labels(labels)} {_number(value)}")
+
+        with self._lock:
+            sources = sorted(self._sources.items())
+            hosts = sorted(self._hosts.items())
+
+            family("downloads_total", "counter", "Downloads finished, by source and result.")
+            for name, s in sources:
+                sample("downloads_total", {"source": name, "result": "ok"}, s.downloaded)
+                sample("downloads_total", {"source": name, "result": "failed"}, s.failed)
+            family("downloaded_bytes_total", "counter", "Bytes of finished downloads.")
+            for name, s in sources:
+                sample("downloaded_bytes_total", {"source": name}, s.bytes)
+            family("metadata_pages_total", "counter", "Metadata pages fetched.")
+            for name, s in sources:
+                sample("metadata_pages_total", {"source": name}, s.pages)
+
+            family("responses_total", "counter", "HTTP responses, by host and status code.")
+            for host, h in hosts:
+                for status, n in sorted(h.statuses.items()):
+                    sample("responses_total", {"host": host, "status": status}, n)
+            family("request_retries_total", "counter", "Requests retried, by host.")
+            for host, h in hosts:
+                sample("request_retries_total", {"host": host}, h.retries)
+            family("request_errors_total", "counter", "Requests that failed without a response, by host.")
+            for host, h in hosts:
+                sample("request_errors_total", {"host": host}, h.errors)
+
+            family("request_duration_seconds", "histogram", "Time to response headers, by host.")
+            for host, h in hosts:
+                cumulative = 0
+                for bound, n in zip(h.latency.buckets, h.latency.counts):
+                    cumulative += n
+                    sample("request_duration_seconds_bucket", {"host": host, "le": bound}, cumulative)
+                sample("request_duration_seconds_bucket", {"host": host, "le": "+Inf"}, h.latency.count)
+                sample("request_duration_seconds_sum", {"host": host}, h.latency.sum)
+                sample("request_duration_seconds_count", {"host": host}, h.latency.count)
+
+        families = {}
+        for name, labels, value in self.gauge_values():
+            families.setdefault(name, []).append((labels, value))
+        for name, samples in sorted(families.items()):
+            family(name, "gauge", name.replace("_", " ").capitalize() + ".")
+            for labels, value in samples:
+                sample(name, labels, value)
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path, **extra):
+        summary = self.snapshot()
+        summary.update(extra)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(summary, indent=2, default=str), encoding="utf-8")
+        tmp.replace(path)
+        return summary
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# One registry per process, like the rate controller
+default_metrics = Metrics()
+
+
+class LiveReport:
+    """
+    Logs throughput, queue depths, active downloads and per-host latency
+    every interval seconds on a background thread, plus once more on stop().
+    Rates are over the last interval.
+    """
+
+    def __init__(self, metrics=None, interval=10.0):
+        self.metrics = metrics or default_metrics
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = (0, 0, time.monotonic())
+        self._last_requests = {}
+
+    def start(self):
+        downloaded, _, total_bytes = self.metrics.totals()
+        self._last = (downloaded, total_bytes, time.monotonic())
+        self._thread = threading.Thread(target=self._loop, name="metrics-report", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+
+    def report(self):
+        downloaded, failed, total_bytes = self.metrics.totals()
+        now = time.monotonic()
+        last_downloaded, last_bytes, last_time = self._last
+        span = max(now - last_time, 1e-9)
+        self._last = (downloaded, total_bytes, now)
+
+        gauges = {}
+        for name, labels, value in self.metrics.gauge_values():
+            gauges.setdefault(name, []).append((labels, value))
+        queued = sum(value for _, value in gauges.get("queue_depth", ()))
+        active = sum(value for _, value in gauges.get("active_downloads", ()))
+        logger.info(
+            f"Progress: {downloaded} downloaded ({(downloaded - last_downloaded) / span:.1f}/s), {failed} failed, "
+            f"{total_bytes / 1e9:.2f} GB ({(total_bytes - last_bytes) / span / 1e6:.1f} MB/s) | "
+            f"queued {queued}, {active} active"
+        )
+
+        limits = {labels["host"]: value for labels, value in gauges.get("host_concurrency_limit", ())}
+        in_flight = {labels["host"]: value for labels, value in gauges.get("host_in_flight", ())}
+        for host, stats in self.metrics.snapshot()["hosts"].items():
+            # Only hosts with traffic since the last report
+            if self._last_requests.get(host) == stats["requests"]:
+                continue
+            self._last_requests[host] = stats["requests"]
+            latency = stats["latency_seconds"]
+            percentiles = " ".join(f"{key} {_ms(latency[key])}" for key in ("p50", "p95", "p99"))
+            limit = f", {in_flight.get(host, 0)}/{limits[host]:.0f} in flight" if host in limits else ""
+            logger.info(
+                f"  {host}: {stats['requests']} requests, {percentiles}, {stats['throttled_429']} x 429, "
+                f"{stats['retries']} retries, {stats['errors']} errors{limit}"
+            )
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = self.metrics.prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/summary.json":
+            body = json.dumps(self.metrics.snapshot(), default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, addr="127.0.0.1", metrics=None):
+    """
+    Serves /metrics (Prometheus) and /summary.json on a daemon thread.
+    Returns the server; call shutdown() to stop it. Port 0 picks a free port
+    (see server.server_port).
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics or default_metrics})
+    server = ThreadingHTTPServer((addr, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://{addr}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,174 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from scraper_core.blockio import BufferPool
+from scraper_core.resumable import DownloadError
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+
+class S3Sink:
+    """
+    Streams downloads straight into S3 (or any S3-compatible store such as
+    MinIO) as multipart uploads, so assets never touch local disk.
+
+    Each object is cut into part_size parts that upload on a shared thread
+    pool while the download continues. Objects smaller than one part go up
+    with a single PutObject. Pass endpoint_url for MinIO, or a ready client
+    (e.g. under moto) as client.
+
+    Implements the sink interface of scraper_core.sinks. Nothing is kept to
+    resume from: a dropped connection aborts the multipart upload and the
+    next attempt starts the object over.
+    """
+
+    sharded = True
+
+    def __init__(self, bucket, prefix="", part_size=8 * 1024 * 1024, max_buffers=32,
+                 upload_workers=16, client=None, endpoint_url=None, **client_kwargs):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is required to stream downloads to S3 (pip install boto3)")
+            client = boto3.client("s3", endpoint_url=endpoint_url, **client_kwargs)
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.part_size = part_size
+        self.buffers = BufferPool(part_size, max_buffers)
+        self._executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="s3-part")
+
+    def key_for(self, relpath):
+        return f"{self.prefix}/{relpath}" if self.prefix else relpath
+
+    def url_for(self, relpath):
+        return f"s3://{self.bucket}/{self.key_for(relpath)}"
+
+    def open(self, relpath, record=None):
+        return _S3Writer(self, self.key_for(relpath))
+
+    def exists(self, relpath):
+        """The object's s3:// URL when it is already uploaded (a HeadObject), else None."""
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key_for(relpath))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return self.url_for(relpath)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class _S3Writer:
+    offset = 0
+
+    def __init__(self, sink, key):
+        self.sink = sink
+        self.key = key
+        self.size = 0
+        self._buffer = None
+        self._filled = 0
+        self._upload_id = None
+        self._parts = []
+        self._done = False
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            if self._buffer is None:
+                self._buffer = self.sink.buffers.acquire()
+                self._filled = 0
+            n = min(len(view), self.sink.part_size - self._filled)
+            self._buffer[self._filled:self._filled + n] = view[:n]
+            self._filled += n
+            self.size += n
+            view = view[n:]
+            if self._filled == self.sink.part_size:
+                self._submit_part(self._buffer)
+                self._buffer = None
+
+    def _submit_part(self, buffer, length=None):
+        sink = self.sink
+        if self._upload_id is None:
+            response = sink.client.create_multipart_upload(Bucket=sink.bucket, Key=self.key)
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        # Full buffers go up as-is; only the short last part is copied
+        body = buffer if length is None else bytes(buffer[:length])
+
+        def upload():
+            try:
+                response = sink.client.upload_part(Bucket=sink.bucket, Key=self.key, UploadId=self._upload_id,
+                                                   PartNumber=part_number, Body=body)
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+            finally:
+                if length is None:
+                    sink.buffers.release(buffer)
+
+        self._parts.append(sink._executor.submit(upload))
+        if length is not None:
+            sink.buffers.release(buffer)
+
+    def truncate(self):
+        self.close()
+        self.size = 0
+        self._upload_id = None
+        self._parts = []
+        self._done = False
+
+    def commit(self, expected_total=None):
+        sink = self.sink
+        if expected_total is not None and self.size != expected_total:
+            raise DownloadError(f"Incomplete download: {self.size}/{expected_total} bytes")
+        if self._upload_id is None:
+            body = bytes(self._buffer[:self._filled]) if self._buffer is not None else b""
+            self._release_buffer()
+            sink.client.put_object(Bucket=sink.bucket, Key=self.key, Body=body)
+            self._done = True
+            return f"s3://{sink.bucket}/{self.key}"
+
+        if self._buffer is not None:
+            self._submit_part(self._buffer, self._filled)
+            self._buffer = None
+        parts = [future.result() for future in self._parts]
+        sink.client.complete_multipart_upload(
+            Bucket=sink.bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        self._done = True
+        return f"s3://{sink.bucket}/{self.key}"
+
+    def close(self):
+        if self._done:
+            return
+        self._done = True
+        self._release_buffer()
+        for future in self._parts:
+            future.cancel()
+        if self._upload_id is None:
+            return
+        for future in self._parts:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        try:
+            self.sink.client.abort_multipart_upload(Bucket=self.sink.bucket, Key=self.key, UploadId=self._upload_id)
+        except Exception as e:
+            logger.warning(f"Could not abort multipart upload of {self.key}: {e}")
+
+    def _release_buffer(self):
+        if self._buffer is not None:
+            self.sink.buffers.release(self._buffer)
+            self._buffer = None
@@ -0,0 +1,122 @@
+import logging
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class ItemQueue:
+    """
+    Bounded hand-off between a metadata producer and download workers.
+
+    put() blocks while the queue is full so metadata fetching never runs far
+    ahead of downloads. Iterating yields (index, item) pairs until close() is
+    called; any number of workers can iterate the same queue.
+    """
+
+    def __init__(self, maxsize=1000):
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.queued = 0
+
+    def put(self, item):
+        with self._lock:
+            self.queued += 1
+            index = self.queued
+        self._queue.put((index, item))
+
+    def close(self):
+        self._queue.put(_DONE)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def __iter__(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _DONE:
+                # Put the marker back so the other workers stop too
+                self._queue.put(_DONE)
+                return
+            yield entry
+
+
+def start_producer(item_queue, produce):
+    """Runs produce() on a background thread and closes the queue when it returns."""
+    def run():
+        try:
+            produce()
+        finally:
+            item_queue.close()
+
+    thread = threading.Thread(target=run, name="metadata-producer", daemon=True)
+    thread.start()
+    return thread
+
+
+def paginate(fetch_page, first_page=1, window=4, limit=None, page_size=None, retries=2, max_skipped=3):
+    """
+    Fetches pages concurrently with at most `window` requests in flight and
+    yields (page, items) in page order.
+
+    Stops at the first empty page or once `limit` items have been yielded.
+    With page_size known, no more pages are requested than are still needed
+    to reach limit. A page fetch_page returns None for (a failed request) is
+    fetched up to `retries` more times, then skipped; after `max_skipped`
+    such pages in a row the search is taken to be down and paging stops.
+    """
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        futures = {}
+        next_page = first_page
+        current = first_page
+        collected = 0
+        failures = {}
+        skipped = 0
+
+        def pages_needed():
+            if limit is None or not page_size:
+                return window
+            return math.ceil((limit - collected) / page_size)
+
+        def fill():
+            nonlocal next_page
+            while len(futures) < min(window, pages_needed()):
+                futures[next_page] = executor.submit(fetch_page, next_page)
+                next_page += 1
+
+        try:
+            fill()
+            while current in futures:
+                items = futures.pop(current).result()
+                if items is None:
+                    failures[current] = failures.get(current, 0) + 1
+                    if failures[current] <= retries:
+                        futures[current] = executor.submit(fetch_page, current)
+                        continue
+                    skipped += 1
+                    if skipped >= max_skipped:
+                        logger.error(f"Pages {current - skipped + 1}-{current} failed; stopping")
+                        return
+                    logger.warning(f"Page {current} failed {failures.pop(current)} times; skipping it")
+                    current += 1
+                    fill()
+                    continue
+                skipped = 0
+                if not items:
+                    return
+                if limit is not None:
+                    items = items[:limit - collected]
+                collected += len(items)
+                yield current, items
+                if limit is not None and collected >= limit:
+                    return
+                current += 1
+                fill()
+        finally:
+            # Pages queued past the last one are no longer needed
+            for future in futures.values():
+                future.cancel()
@@ -0,0 +1,70 @@
+import json
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ExtensionProbe:
+    """
+    Learns which file extension each item type resolves to on the CDN.
+
+    candidates() orders the extensions to try by observed hit count, so once
+    a type's dominant extension is known most items need a single request.
+    Hit counts persist to state_path between runs. The probe also tracks how
+    many requests the learned order saved compared to the fixed order.
+    """
+
+    def __init__(self, state_path=None):
+        self.state_path = Path(state_path) if state_path else None
+        self.hits = {}
+        self.requests = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.hits = {item_type: Counter(counts) for item_type, counts in data.get("hits", {}).items()}
+        except Exception as e:
+            logger.warning(f"Could not load probe stats: {e}")
+
+    def candidates(self, item_type, extensions):
+        with self._lock:
+            hits = self.hits.get(item_type)
+            if not hits:
+                return list(extensions)
+            # sorted() is stable, so unseen extensions keep their default order
+            return sorted(extensions, key=lambda ext: -hits[ext])
+
+    def record(self, item_type, extensions, tried, hit_ext):
+        """
+        Records one item: tried is how many requests it took, hit_ext the
+        extension that resolved (None if none did).
+        """
+        fixed_order_requests = extensions.index(hit_ext) + 1 if hit_ext else len(extensions)
+        with self._lock:
+            self.requests += tried
+            self.saved += fixed_order_requests - tried
+            if hit_ext:
+                self.hits.setdefault(item_type, Counter())[hit_ext] += 1
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            data = {"hits": {item_type: dict(counts) for item_type, counts in self.hits.items()}}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        tmp_path.replace(self.state_path)
+
+    def log_summary(self):
+        logger.info(f"Extension probe: {self.requests} CDN requests, {self.saved} saved vs fixed extension order")
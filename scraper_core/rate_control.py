@@ -0,0 +1,234 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+from scraper_core.metrics import default_metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-host tuning, matched on the hostname suffix. Hosts that match nothing
+# use the limiter defaults.
+HOST_LIMITS = {
+    "api.flim.ai": {"initial_limit": 8, "max_limit": 32},
+    "frameset.app": {"initial_limit": 2, "max_limit": 16},
+    "cloudfront.net": {"initial_limit": 16, "max_limit": 512},
+    "amazonaws.com": {"initial_limit": 16, "max_limit": 512},
+}
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class HostLimiter:
+    """
+    AIMD concurrency limit for a single host.
+
+    The limit doubles per round trip (slow start) until the first sign of
+    trouble, then grows by one per round trip. A 429/5xx cuts it by backoff,
+    and smoothed latency rising past latency_tolerance times the host's
+    no-load latency trims it by 10%, each at most once per cooldown. Between
+    the two, once latency starts to climb, the limit holds.
+    Throttling also pauses new requests for Retry-After (or
+    pause_on_throttle) seconds.
+    """
+
+    def __init__(self, host, initial_limit=8, min_limit=1, max_limit=256, backoff=0.5,
+                 latency_tolerance=1.3, cooldown=1.0, pause_on_throttle=1.0, baseline_window=30.0):
+        self.host = host
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.pause_on_throttle = pause_on_throttle
+        self.baseline_window = baseline_window
+        self.in_flight = 0
+        self.smoothed_latency = None
+        self.baseline_latency = None
+        self.slow_start = True
+        self.stats = {"ok": 0, "throttled": 0, "errors": 0, "decreases": 0}
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._window_start = time.monotonic()
+        self._window_min = None
+        self._prev_window_min = None
+        self._cond = threading.Condition()
+        self._async_waiters = collections.deque()
+
+    def _can_start(self, now):
+        return self.in_flight < int(self.limit) and now >= self._paused_until
+
+    def try_acquire(self):
+        with self._cond:
+            if self._can_start(time.monotonic()):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._can_start(now):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=max(0.01, min(1.0, self._paused_until - now)))
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while not self.try_acquire():
+            waiter = loop.create_future()
+            with self._cond:
+                self._async_waiters.append(waiter)
+                wait = max(0.01, min(1.0, self._paused_until - time.monotonic()))
+            try:
+                await asyncio.wait_for(waiter, timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+            while self._async_waiters:
+                waiter = self._async_waiters.popleft()
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                    break
+
+    def record(self, ok, latency=None, throttled=False, retry_after=None):
+        """Feeds one request outcome into the controller."""
+        with self._cond:
+            now = time.monotonic()
+            if throttled:
+                self.stats["throttled"] += 1
+                self._paused_until = max(self._paused_until, now + (retry_after or self.pause_on_throttle))
+                self._decrease(now, self.backoff)
+            elif not ok:
+                self.stats["errors"] += 1
+                self._decrease(now, self.backoff)
+            elif latency is not None:
+                self.stats["ok"] += 1
+                self._observe_latency(now, latency)
+                ratio = self.smoothed_latency / self.baseline_latency
+                if ratio > self.latency_tolerance:
+                    self._decrease(now, 0.9)
+                elif ratio > (1 + self.latency_tolerance) / 2:
+                    # Queueing has started; hold the limit where it is
+                    pass
+                elif self.slow_start:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _observe_latency(self, now, latency):
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += (latency - self.smoothed_latency) * 0.1
+
+        # No-load latency is the lowest smoothed latency over the last one to
+        # two windows, so it can recover if the host gets permanently slower
+        if now - self._window_start > self.baseline_window:
+            self._prev_window_min = self._window_min
+            self._window_min = None
+            self._window_start = now
+        if self._window_min is None or self.smoothed_latency < self._window_min:
+            self._window_min = self.smoothed_latency
+        self.baseline_latency = min(m for m in (self._window_min, self._prev_window_min) if m is not None)
+
+    def _decrease(self, now, factor):
+        self.slow_start = False
+        if now - self._last_decrease < self.cooldown:
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._last_decrease = now
+        self.stats["decreases"] += 1
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateController:
+    """Hands out one HostLimiter per hostname, configured from host_limits."""
+
+    def __init__(self, host_limits=None):
+        self.host_limits = HOST_LIMITS if host_limits is None else host_limits
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, url):
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, **self._config_for(host))
+                self._limiters[host] = limiter
+            return limiter
+
+    def _config_for(self, host):
+        for suffix, config in self.host_limits.items():
+            if host == suffix or host.endswith("." + suffix):
+                return config
+        return {}
+
+    def gauges(self):
+        """Per-host limit and in-flight requests as (name, labels, value), for scraper_core.metrics."""
+        with self._lock:
+            limiters = list(self._limiters.items())
+        values = []
+        for host, limiter in limiters:
+            values.append(("host_concurrency_limit", {"host": host}, round(limiter.limit, 2)))
+            values.append(("host_in_flight", {"host": host}, limiter.in_flight))
+        return values
+
+    def log_summary(self):
+        for host, limiter in sorted(self._limiters.items()):
+            stats = limiter.stats
+            logger.info(
+                f"{host}: concurrency limit {limiter.limit:.1f}, {stats['ok']} ok, "
+                f"{stats['throttled']} throttled, {stats['errors']} errors, {stats['decreases']} backoffs"
+            )
+
+
+# One controller per process so every scraper and engine sees the same host state
+default_controller = RateController()
+
+
+def record_response(limiter, status, latency, retry_after=None, history=()):
+    """
+    Records a response with the limiter and the run metrics, counting
+    statuses that urllib3 already retried.
+    """
+    default_metrics.record_request(limiter.host, status, latency, history)
+    for past_status in history:
+        if past_status in THROTTLE_STATUSES:
+            limiter.record(ok=False, throttled=True)
+        elif past_status >= 500:
+            limiter.record(ok=False)
+
+    if status in THROTTLE_STATUSES:
+        limiter.record(ok=False, throttled=True, retry_after=parse_retry_after(retry_after))
+    elif status >= 500:
+        limiter.record(ok=False)
+    else:
+        limiter.record(ok=True, latency=latency)
+
+
+def record_error(limiter):
+    """Records a request that failed without a response."""
+    limiter.record(ok=False)
+    default_metrics.record_error(limiter.host)
+
+
+def parse_retry_after(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+
+# -----------------------------------------------------------------------------
+# Resumable downloads. Bytes land in "{name}.part" next to the final path and
+# are only moved into place (atomically) once the size matches what the server
+# announced. An interrupted transfer is resumed with a Range request.
+# The helpers here back the local sinks (scraper_core/sinks.py) and the
+# async engine.
+# -----------------------------------------------------------------------------
+
+PART_SUFFIX = ".part"
+
+# Rejected or error responses up to this size are read to the end so their
+# connection goes back to the pool instead of being discarded
+DRAIN_LIMIT = 64 * 1024
+
+
+class DownloadError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def part_path(filepath: Path) -> Path:
+    return filepath.with_name(filepath.name + PART_SUFFIX)
+
+
+def resume_offset(part: Path) -> int:
+    try:
+        return part.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def range_headers(offset: int) -> dict:
+    # Media is already compressed; asking for identity keeps byte offsets
+    # and Content-Length comparable with what lands on disk
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+    return headers
+
+
+def parse_content_range(value):
+    """
+    Parses "bytes 100-199/1000" or "bytes */1000".
+    Returns (start, total); either is None when absent.
+    """
+    if not value:
+        return None, None
+    _, _, spec = value.partition(" ")
+    span, _, total = spec.partition("/")
+    start = span.split("-")[0]
+    return (int(start) if start.isdigit() else None,
+            int(total) if total.isdigit() else None)
+
+
+def plan_write(status, headers, offset):
+    """
+    Decides how to write a response to a (possibly ranged) request.
+    Returns (write_offset, expected_total); expected_total is None when unknown.
+    """
+    if status == 206:
+        start, total = parse_content_range(headers.get("Content-Range"))
+        if start != offset:
+            raise DownloadError(f"Server resumed at byte {start}, expected {offset}", status)
+        return offset, total
+    if status == 200:
+        # Range ignored (or not sent): start over
+        length = headers.get("Content-Length")
+        return 0, int(length) if length and length.isdigit() else None
+    raise DownloadError(f"HTTP {status}", status)
+
+
+def complete_from_416(headers, part: Path, filepath: Path, offset: int) -> bool:
+    """
+    Handles 416 Range Not Satisfiable on a resume attempt. Returns True when
+    the partial file already held the whole asset and was moved into place;
+    otherwise discards it so the next attempt starts over.
+    """
+    _, total = parse_content_range(headers.get("Content-Range"))
+    if total == offset:
+        finalize(part, filepath, total)
+        return True
+    part.unlink(missing_ok=True)
+    return False
+
+
+def finalize(part: Path, filepath: Path, expected_total):
+    size = part.stat().st_size
+    if expected_total is not None and size != expected_total:
+        raise DownloadError(f"Incomplete download: {size}/{expected_total} bytes")
+    os.replace(part, filepath)
+
+
+def _drain(response):
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) <= DRAIN_LIMIT:
+        try:
+            response.content
+        except OSError:
+            pass
@@ -0,0 +1,191 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from scraper_core.blockio import BlockWriter, borrow_buffer, copy_body
+from scraper_core.resumable import DownloadError, _drain, parse_content_range
+
+# -----------------------------------------------------------------------------
+# Segmented downloads for large files. Once a response turns out to be larger
+# than the threshold and the server accepts ranges, the rest of the file is
+# fetched as parallel byte-range requests while the first response keeps
+# streaming its own segment. Every segment is written into one preallocated
+# "{name}.seg" file with positional writes, batched through a buffer.
+#
+# If a transfer fails, the contiguous prefix of finished segments is kept as
+# the "{name}.part" file, so the next attempt resumes from it with a plain
+# Range request. A ".seg" file left by a crash is never resumed from, since
+# its preallocated size says nothing about which bytes arrived.
+# -----------------------------------------------------------------------------
+
+SEG_SUFFIX = ".seg"
+
+
+@dataclass
+class SegmentPolicy:
+    """
+    When and how to split a download: files of at least threshold bytes are
+    fetched as segment_size ranges, up to workers at a time on top of the
+    first response. Each segment is read into a pooled buffer_size buffer
+    and written from it in aligned positional writes; chunk_size is the read
+    size where a response can't be read into the buffer directly.
+    """
+    threshold: int = 64 * 1024 * 1024
+    segment_size: int = 16 * 1024 * 1024
+    workers: int = 4
+    chunk_size: int = 256 * 1024
+    buffer_size: int = 1024 * 1024
+
+
+def segment_ranges(total, segment_size):
+    """Inclusive (start, end) byte ranges covering total bytes."""
+    return [(start, min(start + segment_size, total) - 1) for start in range(0, total, segment_size)]
+
+
+def preallocate(fd, size):
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # e.g. unsupported by the filesystem
+    os.ftruncate(fd, size)
+
+
+def _pwrite_all(fd, data, offset):
+    while data:
+        n = os.pwrite(fd, data, offset)
+        data = data[n:]
+        offset += n
+
+
+class SegmentedFile:
+    """
+    Preallocated destination for one segmented download. commit() moves it to
+    filepath once every segment has been written; close() without commit
+    keeps the finished prefix as part for a later resume.
+    """
+
+    def __init__(self, filepath, part, total, segment_size, location=None):
+        self.filepath = Path(filepath)
+        self.part = Path(part)
+        self.path = self.filepath.with_name(self.filepath.name + SEG_SUFFIX)
+        self.total = total
+        self.location = location
+        self.ranges = segment_ranges(total, segment_size)
+        self._done = [False] * len(self.ranges)
+        self._lock = threading.Lock()
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        preallocate(self.fd, total)
+
+    def segment(self, index, buffer):
+        return _SegmentWriter(self, index, buffer)
+
+    def _mark_done(self, index):
+        with self._lock:
+            self._done[index] = True
+
+    def commit(self):
+        if not all(self._done):
+            raise DownloadError("Segmented download is missing segments")
+        os.close(self.fd)
+        self.fd = None
+        os.replace(self.path, self.filepath)
+        self.part.unlink(missing_ok=True)
+        return self.location
+
+    def close(self):
+        if self.fd is None:
+            return
+        prefix = 0
+        for (_, end), done in zip(self.ranges, self._done):
+            if not done:
+                break
+            prefix = end + 1
+        os.ftruncate(self.fd, prefix)
+        os.close(self.fd)
+        self.fd = None
+        if prefix:
+            os.replace(self.path, self.part)
+        else:
+            self.path.unlink(missing_ok=True)
+
+
+class _SegmentWriter(BlockWriter):
+    """
+    Buffers one segment's bytes and writes them at their position. write()
+    returns False once the segment is complete, so the caller can stop
+    reading a response that runs past it.
+    """
+
+    def __init__(self, seg, index, buffer):
+        self.seg = seg
+        self.index = index
+        self.start, end = seg.ranges[index]
+        super().__init__(self._pwrite, buffer, offset=self.start, limit=end + 1 - self.start)
+
+    def _pwrite(self, data):
+        _pwrite_all(self.seg.fd, data, self.start)
+        self.start += len(data)
+
+    def close(self):
+        self.flush()
+        if self.remaining:
+            raise DownloadError(f"Segment {self.index} ended {self.remaining} bytes short")
+        self.seg._mark_done(self.index)
+
+
+def wants_segments(response_headers, total, threshold):
+    return bool(threshold and total and total >= threshold
+                and response_headers.get("Accept-Ranges", "").lower() == "bytes")
+
+
+def check_range_response(status, headers, start, end):
+    if status != 206:
+        raise DownloadError(f"HTTP {status} for bytes {start}-{end}", None if status == 200 else status)
+    got, _ = parse_content_range(headers.get("Content-Range"))
+    if got != start:
+        raise DownloadError(f"Server sent byte {got} for a range starting at {start}")
+
+
+def fetch_segments(session, url, response, seg, policy, timeout=30, headers=None, **kwargs):
+    """
+    Completes seg from a response already streaming from byte 0 plus ranged
+    GETs for the other segments on up to policy.workers threads. Returns the
+    bytes written; raises DownloadError or OSError, leaving seg to be closed.
+    """
+    headers = {**(headers or {}), "Accept-Encoding": "identity"}
+
+    def copy(response, index):
+        with borrow_buffer(policy.buffer_size) as buffer:
+            writer = seg.segment(index, buffer)
+            copy_body(response, writer, policy.chunk_size)
+            writer.close()
+
+    def fetch(index):
+        start, end = seg.ranges[index]
+        ranged = session.get(url, headers={**headers, "Range": f"bytes={start}-{end}"},
+                             timeout=timeout, stream=True, **kwargs)
+        with ranged:
+            try:
+                check_range_response(ranged.status_code, ranged.headers, start, end)
+            except DownloadError:
+                _drain(ranged)
+                raise
+            copy(ranged, index)
+
+    with ThreadPoolExecutor(max_workers=policy.workers, thread_name_prefix="segment") as executor:
+        futures = [executor.submit(fetch, index) for index in range(1, len(seg.ranges))]
+        try:
+            copy(response, 0)
+            # Hand back the first response's connection (and rate-limit slot)
+            # before waiting on the other segments
+            response.close()
+            for future in futures:
+                future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    return seg.total
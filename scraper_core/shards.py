@@ -0,0 +1,70 @@
+import itertools
+import re
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    One sub-query of a search: filter values that results must match, and
+    values they must not (the remainder of a dimension). key names the shard
+    in logs and in its crawl state file.
+    """
+
+    key: str
+    filters: dict = field(default_factory=dict)
+    negative_filters: dict = field(default_factory=dict)
+
+    @property
+    def slug(self):
+        return re.sub(r"[^A-Za-z0-9_.=-]+", "_", self.key)
+
+
+def plan_shards(dimensions, remainder_dims=()):
+    """
+    Splits a search into the cross product of its filter dimensions.
+
+    dimensions maps a filter name to the values to split on; a list entry
+    is one shard matching any of its values, so small values can share one.
+    For each name in remainder_dims, one more shard excludes every listed
+    value through the negative filters, so results with other (or no)
+    values are still crawled. Shards are disjoint on filters where each
+    result has a single value (years, shot_types, ...); on multi-valued ones
+    such as genres a result can show up in several, and the engine drops
+    the repeats.
+    """
+    axes = []
+    for name, values in dimensions.items():
+        groups = [value if isinstance(value, (list, tuple)) else [value] for value in values]
+        options = [(f"{name}={'|'.join(map(str, group))}", {name: list(group)}, {}) for group in groups]
+        if name in remainder_dims:
+            options.append((f"{name}=other", {}, {name: [v for group in groups for v in group]}))
+        axes.append(options)
+
+    shards = []
+    for combination in itertools.product(*axes):
+        key = "+".join(part[0] for part in combination)
+        filters = {k: v for part in combination for k, v in part[1].items()}
+        negative = {k: v for part in combination for k, v in part[2].items()}
+        shards.append(Shard(key, filters, negative))
+    return shards
+
+
+def parse_shard_spec(specs):
+    """Parses CLI values like "years=1990,2000" or "genres=DRAMA|THRILLER,COMEDY" into dimensions."""
+    dimensions = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not name or not values:
+            raise ValueError(f"expected NAME=VALUE,VALUE,... but got {spec!r}")
+        groups = []
+        for value in values.split(","):
+            group = [_parse_value(v) for v in value.split("|") if v]
+            groups.append(group[0] if len(group) == 1 else group)
+        dimensions.setdefault(name.strip(), []).extend(groups)
+    return dimensions
+
+
+def _parse_value(value):
+    value = value.strip()
+    return int(value) if value.isdigit() else value
@@ -0,0 +1,409 @@
+import io
+import json
+import os
+import re
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from scraper_core.blockio import BLOCK_SIZE, BlockWriter, borrow_buffer, copy_body
+from scraper_core.metrics import default_metrics, host_of
+from scraper_core.object_store import S3Sink
+from scraper_core.resumable import (
+    DownloadError, _drain, parse_content_range, part_path, plan_write, range_headers, resume_offset,
+)
+from scraper_core.segmented import SegmentedFile, fetch_segments, wants_segments
+
+# -----------------------------------------------------------------------------
+# Storage sinks. Downloads write through a sink instead of opening files
+# themselves, so where assets end up (flat or sharded folders, tar shards, an
+# object store) is a deployment choice. sink.open(relpath, record) returns a
+# writer; record is the item's metadata, which sinks may store alongside:
+#
+#   writer.offset         bytes kept from an earlier attempt (resume point)
+#   writer.write(data)
+#   writer.truncate()     drop kept bytes when the server ignores the Range
+#   writer.commit(total)  publish the asset, checking the size against total
+#                         when known; returns where it was stored
+#   writer.close()        give up; resumable sinks keep what was written
+#
+# sink.exists(relpath) says where an asset is already stored, if anywhere, so
+# a resumed run can skip what a crashed one finished.
+#
+# S3Sink (scraper_core.object_store) is the object-store backend. Each
+# backend defaults to the buffer size and fsync policy that measured fastest
+# for it in benchmarks/bench_sinks.py.
+# -----------------------------------------------------------------------------
+
+
+class Sink:
+    """
+    Base class for storage backends. sharded tells the Source to name assets
+    by their `{type}/{shard}/{uuid}.{ext}` upload key instead of `{id}.{ext}`.
+    """
+
+    sharded = False
+
+    def open(self, relpath, record=None):
+        raise NotImplementedError
+
+    def exists(self, relpath):
+        """
+        Where relpath is already stored complete (what commit() would
+        return), or None; sinks that can't tell cheaply say None.
+        """
+        return None
+
+    def close(self):
+        pass
+
+
+class LocalSink(Sink):
+    """
+    Writes each asset to folder/relpath through a `.part` file that is moved
+    into place once complete, so an interrupted download resumes with a Range
+    request. fsync=True syncs every file before it is moved into place; it
+    roughly halves throughput, so it is off by default. Buffers past 256 KiB
+    made no measurable difference.
+    """
+
+    def __init__(self, folder, buffer_size=256 * 1024, fsync=False):
+        self.folder = Path(folder)
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self._made_dirs = set()
+
+    def open(self, relpath, record=None):
+        return _FileWriter(self, self.path_for(relpath), relpath)
+
+    def path_for(self, relpath):
+        """folder/relpath with its directory created, for writers of their own (the async engine)."""
+        filepath = self.folder / relpath
+        parent = filepath.parent
+        # A few hundred shard directories at most, so each is created once
+        if parent not in self._made_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._made_dirs.add(parent)
+        return filepath
+
+    def exists(self, relpath):
+        # Only complete files are moved to their final path
+        return relpath if (self.folder / relpath).exists() else None
+
+
+class ShardedLocalSink(LocalSink):
+    """LocalSink for the sharded upload layout; the default for new runs."""
+
+    sharded = True
+
+
+class _FileWriter:
+    def __init__(self, sink, filepath, relpath):
+        self.sink = sink
+        self.filepath = filepath
+        self.relpath = relpath
+        self.part = part_path(filepath)
+        self.offset = resume_offset(self.part)
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.part, "ab", buffering=self.sink.buffer_size)
+        return self._file
+
+    def write(self, data):
+        self._open().write(data)
+
+    def truncate(self):
+        f = self._open()
+        f.seek(0)
+        f.truncate()
+        self.offset = 0
+
+    def commit(self, expected_total=None):
+        f = self._open()
+        f.flush()
+        if self.sink.fsync:
+            os.fsync(f.fileno())
+        size = f.tell()
+        self.close()
+        if expected_total is not None and size != expected_total:
+            raise DownloadError(f"Incomplete download: {size}/{expected_total} bytes")
+        os.replace(self.part, self.filepath)
+        return self.relpath
+
+    def segmented(self, total, segment_size):
+        return SegmentedFile(self.filepath, self.part, total, segment_size, self.relpath)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TarShardSink(Sink):
+    """
+    Packs assets into rolling WebDataset-style tar shards
+    (`shard-000000.tar`, ...) of about shard_size bytes for training
+    loaders. Each sample is the asset plus, when the download carried one,
+    its metadata record as JSON, stored as consecutive members sharing a
+    key: `videos/ab/{uuid}.mp4` and `videos/ab/{uuid}.json`.
+
+    Assets are spooled (in memory up to spool_size, then to a temporary
+    file) and appended to the current shard under a lock, so shards are
+    written strictly sequentially. `_shards.tsv` indexes every member as
+    "member<TAB>shard<TAB>offset<TAB>size", offset being where its bytes
+    start in the shard, for random access with a seek or a Range request.
+
+    fsync is "shard" (sync each shard and the index when a shard is
+    closed), "item" (sync after every sample) or None. A run always starts a
+    new shard; a shard cut short by a crash still reads up to its last
+    complete member. With sendfile (Linux), assets that were spooled to disk
+    are copied into the shard by the kernel instead of through Python.
+    """
+
+    sharded = True
+    INDEX_NAME = "_shards.tsv"
+    _SHARD_NAME = re.compile(r"shard-(\d+)\.tar$")
+
+    def __init__(self, folder, shard_size=1024 ** 3, buffer_size=1024 * 1024,
+                 spool_size=16 * 1024 * 1024, fsync="shard", sendfile=True):
+        self.folder = Path(folder)
+        self.shard_size = shard_size
+        self.buffer_size = buffer_size
+        self.spool_size = spool_size
+        self.fsync = fsync
+        self.sendfile = sendfile and hasattr(os, "sendfile") and sys.platform.startswith("linux")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._next_shard = 1 + max((int(m.group(1)) for m in map(self._SHARD_NAME.match, os.listdir(self.folder))
+                                    if m), default=-1)
+        self._file = None
+        self._tar = None
+        self._index = None
+        self.shard_name = None
+        self.samples = 0
+
+    def open(self, relpath, record=None):
+        return _TarWriter(self, relpath, record)
+
+    def _open_shard(self):
+        if self._index is None:
+            self._index = open(self.folder / self.INDEX_NAME, "a", encoding="utf-8")
+        self.shard_name = f"shard-{self._next_shard:06d}.tar"
+        self._next_shard += 1
+        self._file = open(self.folder / self.shard_name, "xb", buffering=self.buffer_size)
+        self._tar = tarfile.open(fileobj=self._file, mode="w", copybufsize=self.buffer_size)
+
+    def _close_shard(self):
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._sync(self.fsync)
+        self._file.close()
+        self._tar = None
+        self._file = None
+
+    def _sync(self, fsync):
+        self._file.flush()
+        self._index.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+            os.fsync(self._index.fileno())
+
+    def _add_member(self, name, fileobj, size, mtime, fd=None):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = mtime
+        info.mode = 0o644
+        if fd is None:
+            self._tar.addfile(info, fileobj)
+        else:
+            self._sendfile_member(info, fd)
+        # The archive offset now sits just past the member's padded data
+        padded = -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self._index.write(f"{name}\t{self.shard_name}\t{self._tar.offset - padded}\t{size}\n")
+
+    def _sendfile_member(self, info, fd):
+        # TarFile.addfile() with the data copied from fd by the kernel
+        tar = self._tar
+        header = info.tobuf(tar.format, tar.encoding, tar.errors)
+        self._file.write(header)
+        self._file.flush()
+        out = self._file.fileno()
+        sent = 0
+        while sent < info.size:
+            sent += os.sendfile(out, fd, sent, info.size - sent)
+        # sendfile moved the descriptor's position behind the buffered file's back
+        self._file.seek(0, os.SEEK_END)
+        padding = -info.size % tarfile.BLOCKSIZE
+        self._file.write(tarfile.NUL * padding)
+        tar.offset += len(header) + info.size + padding
+        tar.members.append(info)
+
+    def _append(self, relpath, fileobj, size, record=None, fd=None):
+        meta = None if record is None else json.dumps(record, ensure_ascii=False).encode("utf-8")
+        sample_size = size + (len(meta) if meta else 0)
+        mtime = int(time.time())
+        with self._lock:
+            if self._tar is not None and self._file.tell() + sample_size > self.shard_size:
+                self._close_shard()
+            if self._tar is None:
+                self._open_shard()
+            self._add_member(relpath, fileobj, size, mtime, fd)
+            if meta is not None:
+                key = relpath.rpartition(".")[0] or relpath
+                self._add_member(f"{key}.json", io.BytesIO(meta), len(meta), mtime)
+            self.samples += 1
+            if self.fsync == "item":
+                self._sync(True)
+            return f"tar://{self.shard_name}/{relpath}"
+
+    def close(self):
+        with self._lock:
+            self._close_shard()
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+class _TarWriter:
+    offset = 0
+
+    def __init__(self, sink, relpath, record=None):
+        self.sink = sink
+        self.relpath = relpath
+        self.record = record
+        self._spool = tempfile.SpooledTemporaryFile(max_size=sink.spool_size, dir=sink.folder)
+
+    def write(self, data):
+        self._spool.write(data)
+
+    def truncate(self):
+        self._spool.seek(0)
+        self._spool.truncate()
+
+    def commit(self, expected_total=None):
+        size = self._spool.tell()
+        try:
+            if expected_total is not None and size != expected_total:
+                raise DownloadError(f"Incomplete download: {size}/{expected_total} bytes")
+            self._spool.seek(0)
+            # Past spool_size the spool is a real file the kernel can copy from
+            fd = self._spool.fileno() if self.sink.sendfile and size > self.sink.spool_size else None
+            return self.sink._append(self.relpath, self._spool, size, self.record, fd)
+        finally:
+            self.close()
+
+    def close(self):
+        self._spool.close()
+
+
+SINKS = {
+    "local": LocalSink,
+    "sharded": ShardedLocalSink,
+    "tar": TarShardSink,
+    "s3": S3Sink,
+}
+
+
+def build_sink(kind, folder, bucket=None, endpoint_url=None, shard_size=None, **options):
+    """
+    Builds a sink by SINKS name; local kinds write under folder, "s3" to
+    bucket. shard_size only applies to "tar".
+    """
+    if kind not in SINKS:
+        raise ValueError(f"Unknown sink {kind!r}; choose from {', '.join(SINKS)}")
+    if kind == "s3":
+        if not bucket:
+            raise ValueError("The s3 sink needs a bucket")
+        return S3Sink(bucket, endpoint_url=endpoint_url, **options)
+    if kind == "tar" and shard_size:
+        options["shard_size"] = shard_size
+    return SINKS[kind](folder, **options)
+
+
+def build_partition_sink(kind, folder, partition, **options):
+    """
+    build_sink for one worker process of a multi-process run. Tar shards go
+    to the worker's own `part-{partition}` folder, so no two processes append
+    to one shard or index; the other sinks name assets by id and are shared.
+    """
+    if kind == "tar":
+        folder = Path(folder) / f"part-{partition:03d}"
+    return build_sink(kind, folder, **options)
+
+
+def download_to_sink(session, url, sink, relpath, record=None, block_size=BLOCK_SIZE, chunk_size=None, timeout=30,
+                     resume_attempts=3, accept=None, headers=None, segments=None, **kwargs):
+    """
+    Downloads url into sink under relpath, resuming after dropped connections
+    when the sink kept a partial copy. session is anything with a
+    requests-style get(). record, the item's metadata, is handed to the sink.
+
+    accept(response), when given, is checked before a fresh (non-resumed)
+    write and may reject the response. Returns (bytes_written, location),
+    location being what the sink's commit() returned, or None if the
+    response was rejected. Raises DownloadError on HTTP errors and size
+    mismatches.
+
+    The body is read into a pooled block_size buffer and handed to the sink
+    in whole blocks (scraper_core.blockio); chunk_size only sets the read
+    size for responses that can't be read into the buffer directly. With a
+    SegmentPolicy as segments, a fresh download past its threshold into a
+    local sink continues as parallel range requests (scraper_core.segmented).
+    """
+    for attempt in range(resume_attempts + 1):
+        writer = sink.open(relpath, record)
+        try:
+            offset = writer.offset
+            response = session.get(url, headers={**(headers or {}), **range_headers(offset)},
+                                   timeout=timeout, stream=True, **kwargs)
+            with response:
+                if response.status_code == 416 and offset:
+                    # The kept copy may already be the whole asset
+                    _, total = parse_content_range(response.headers.get("Content-Range"))
+                    if total == offset:
+                        return 0, writer.commit(total)
+                    writer.truncate()
+                    continue
+
+                try:
+                    write_offset, total = plan_write(response.status_code, response.headers, offset)
+                except DownloadError:
+                    _drain(response)
+                    raise
+                if accept and not write_offset and not accept(response):
+                    _drain(response)
+                    return None
+
+                if (segments and not write_offset and hasattr(writer, "segmented")
+                        and wants_segments(response.headers, total, segments.threshold)):
+                    seg = writer.segmented(total, segments.segment_size)
+                    try:
+                        written = fetch_segments(session, url, response, seg, segments,
+                                                 timeout=timeout, headers=headers, **kwargs)
+                        return written, seg.commit()
+                    finally:
+                        seg.close()
+
+                if offset and not write_offset:
+                    writer.truncate()
+                with borrow_buffer(block_size) as buffer:
+                    written = copy_body(response, BlockWriter(writer.write, buffer, write_offset), chunk_size)
+            return written, writer.commit(total)
+        except OSError:
+            # Dropped connection or read timeout: resume from what the sink kept
+            if attempt == resume_attempts:
+                raise
+            default_metrics.record_retry(host_of(url))
+        except DownloadError as e:
+            if e.status is None and attempt < resume_attempts:
+                default_metrics.record_retry(host_of(url))
+                continue
+            raise
+        finally:
+            writer.close()
@@ -0,0 +1,9 @@
+"""Source adapters for the shared scraper engine, keyed by CLI name."""
+from scraper_core.sources.flim import FlimStillSource, FlimVideoSource
+from scraper_core.sources.frameset import FramesetSource
+
+SOURCES = {
+    FlimVideoSource.name: FlimVideoSource,
+    FlimStillSource.name: FlimStillSource,
+    FramesetSource.name: FramesetSource,
+}
@@ -0,0 +1,34 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+
+def jwt_hours_left(token):
+    """Hours until a JWT's exp claim, or None if the token can't be read."""
+    try:
+        if not token:
+            return None
+        parts = token.replace("Bearer ", "").strip().split(".")
+        if len(parts) != 3:
+            return None
+
+        payload = parts[1]
+        padding = 4 - len(payload) % 4
+        if padding != 4:
+            payload += "=" * padding
+
+        data = json.loads(base64.urlsafe_b64decode(payload))
+        if "exp" in data:
+            exp_time = datetime.fromtimestamp(data["exp"])
+            return (exp_time - datetime.now()).total_seconds() / 3600
+    except Exception:
+        pass
+    return None
+
+
+def read_credentials(env_name):
+    """Credentials listed one per line in an environment variable; [] when it is unset."""
+    if not env_name:
+        return []
+    return [line.strip() for line in os.getenv(env_name, "").splitlines() if line.strip()]
@@ -0,0 +1,207 @@
+import os
+from urllib.parse import urlparse
+
+from urllib3.util.retry import Retry
+
+from scraper_core.engine import Attempt, Source
+from scraper_core.rate_control import default_controller
+from scraper_core.sources.auth import jwt_hours_left
+from scraper_core.transport import build_session, is_object_storage_url
+
+# Overridable to point the scraper at a stand-in (benchmarks/mock_services.py)
+SEARCH_URL = os.getenv("FLIM_SEARCH_URL", "https://api.flim.ai/2.0.0/search")
+PAGE_SIZE = 200
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+
+
+def api_headers(auth_token):
+    return {
+        "authority": "api.flim.ai",
+        "accept": "*/*",
+        "accept-encoding": "gzip, deflate, br, zstd",
+        "authorization": auth_token,
+        "content-type": "application/json",
+        "origin": "https://app.flim.ai",
+        "referer": "https://app.flim.ai/",
+        "user-agent": USER_AGENT,
+    }
+
+
+def retry_strategy():
+    return Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET", "POST", "OPTIONS"]
+    )
+
+
+def get_payload(page, has_video_cuts, shard=None):
+    payload = {
+        "search": {
+            "saved_images": False,
+            "full_text": "",
+            "similar_picture_id": "",
+            "movie_id": "",
+            "dop": "",
+            "director": "",
+            "brand": "",
+            "agency": "",
+            "production_company": "",
+            "actor": "",
+            "creator": "",
+            "artist": "",
+            "collection_id": "",
+            "board_id": "",
+            "filters": {
+                "genres": [],
+                "colors": [],
+                "number_of_persons": [],
+                "years": [],
+                "shot_types": [],
+                "movie_types": [],
+                "aspect_ratio": [],
+                "safety_content": [],
+                "has_video_cuts": has_video_cuts,
+                "camera_motions": []
+            },
+            "negative_filters": {
+                "aspect_ratio": [],
+                "genres": ["ANIMATION"],
+                "movie_types": [],
+                "colors": [],
+                "shot_types": [],
+                "number_of_persons": [],
+                "years": [],
+                "safety_content": []
+            }
+        },
+        "page": page,
+        "number_per_pages": PAGE_SIZE
+    }
+    if shard is not None:
+        search = payload["search"]
+        for name, values in shard.filters.items():
+            search["filters"][name] = list(values)
+        for name, values in shard.negative_filters.items():
+            search["negative_filters"][name] = search["negative_filters"][name] + list(values)
+    return payload
+
+
+class FlimSource(Source):
+    """
+    Shared Flim search plumbing. The video and still sources differ only in
+    the has_video_cuts filter and in how an item maps to a download.
+    """
+
+    has_video_cuts = None
+    first_page = 0
+    page_size = PAGE_SIZE
+    shard_filters = ("years", "genres", "shot_types", "aspect_ratio", "camera_motions")
+    # camera_motions has no negative filter, so it gets no remainder shard
+    remainder_filters = ("years", "genres", "shot_types", "aspect_ratio")
+    credential_option = "auth_token"
+    credentials_env = "FLIM_AUTH_TOKENS"
+
+    def __init__(self, output_folder=None, target_count=10000, auth_token=None, download_workers=48,
+                 metadata_workers=8, **kwargs):
+        super().__init__(output_folder, target_count, download_workers=download_workers,
+                         metadata_workers=metadata_workers, **kwargs)
+        self.auth_token = auth_token if auth_token is not None else os.getenv("FLIM_AUTH_TOKEN")
+        # Fixed worker counts are upper bounds; the adaptive controller picks the
+        # effective per-host concurrency from 429/5xx and latency feedback
+        self.session = build_session(
+            headers=api_headers(self.auth_token),
+            pool_size=download_workers,
+            pool_hosts=download_workers,
+            retries=retry_strategy(),
+            controller=default_controller,
+        )
+
+    def check_auth(self):
+        if not self.auth_token:
+            self.log.error("AUTH_TOKEN is not set!")
+            return False
+
+        hours = jwt_hours_left(self.auth_token)
+        if hours is not None:
+            self.log.info(f"Token is valid. Expires in ~{hours:.1f} hours.")
+            if hours <= 0:
+                self.log.error("Token has expired.")
+                return False
+        return True
+
+    def fetch_page(self, page, shard=None):
+        try:
+            response = self.session.post(SEARCH_URL, json=get_payload(page, self.has_video_cuts, shard), timeout=30)
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("query_response", {}).get("images", [])
+            else:
+                self.log.error(f"Page {page}: Error {response.status_code}")
+                return None
+        except Exception as e:
+            self.log.error(f"Page {page}: {e}")
+            return None
+
+
+class FlimVideoSource(FlimSource):
+    name = "flim-video"
+    label = "videos"
+    asset_type = "videos"
+    default_folder = "flim_downloads"
+    has_video_cuts = True
+    asset_extensions = ("mp4",)
+
+    def __init__(self, output_folder=None, engine="async", **kwargs):
+        super().__init__(output_folder, engine=engine, **kwargs)
+
+    def is_downloadable(self, item):
+        return bool(item.get("has_video_urls"))
+
+    def attempts(self, item, item_id):
+        url = item.get("video_urls", {}).get("url_full")
+        return [Attempt(url, self.asset_path(item_id, "mp4"))] if url else []
+
+    def async_headers(self):
+        return dict(self.session.headers)
+
+
+class FlimStillSource(FlimSource):
+    name = "flim-still"
+    label = "stills"
+    asset_type = "images"
+    default_folder = "flim_still_downloads"
+    has_video_cuts = False
+    asset_extensions = ("png", "jpeg", "jpg")
+
+    def __init__(self, output_folder=None, **kwargs):
+        super().__init__(output_folder, **kwargs)
+        # Object storage URLs are pre-signed or public: no auth header, but the
+        # same pooling and retries as the API session
+        self.storage_session = build_session(
+            pool_size=self.download_workers,
+            retries=retry_strategy(),
+            controller=default_controller,
+        )
+
+    def keep(self, item):
+        return not item.get("has_video_urls") and bool(item.get("full_resolution_url"))
+
+    is_downloadable = keep
+
+    def attempts(self, item, item_id):
+        url = item.get("full_resolution_url")
+        if not url:
+            return []
+        path = urlparse(url).path.lower()
+        ext = "png"
+        if path.endswith(".jpeg"):
+            ext = "jpeg"
+        elif path.endswith(".jpg"):
+            ext = "jpg"
+        return [Attempt(url, self.asset_path(item_id, ext))]
+
+    def session_for(self, url):
+        return self.storage_session if is_object_storage_url(url) else self.session
@@ -0,0 +1,202 @@
+import base64
+import json
+import os
+
+from scraper_core.engine import Attempt, Source
+from scraper_core.probe import ExtensionProbe
+from scraper_core.rate_control import default_controller
+from scraper_core.sources.auth import jwt_hours_left
+from scraper_core.transport import Http2Session, build_session, httpx
+
+# Overridable to point the scraper at stand-ins (benchmarks/mock_services.py)
+SEARCH_URL = os.getenv("FRAMESET_SEARCH_URL", "https://frameset.app/api/search")
+CDN_BASE = os.getenv("FRAMESET_CDN_BASE", "https://d13mryl9xv19vu.cloudfront.net")
+AUTH_COOKIE = "sb-rxmhjspmurpimzyrvtzs-auth-token"
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+
+HEADERS = {
+    "authority": "frameset.app",
+    "accept": "*/*",
+    "accept-encoding": "gzip, deflate, br, zstd",
+    "accept-language": "en-US,en;q=0.9",
+    "referer": "https://frameset.app/search",
+    "sec-ch-ua": '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": USER_AGENT
+}
+
+CDN_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br, zstd",
+    "Referer": "https://frameset.app/",
+    "Origin": "https://frameset.app",
+    "Sec-Fetch-Dest": "image",
+    "Sec-Fetch-Mode": "no-cors",
+    "Sec-Fetch-Site": "cross-site",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+    "DNT": "1"
+}
+
+# item type -> (CDN filename suffix, extensions in default probe order, asset type)
+MEDIA_VARIANTS = {
+    "motion": ("_fs", ["gif", "mp4"], "videos"),
+    "still": ("_xl", ["jpg", "jpeg", "png"], "images"),
+}
+
+
+def parse_cookies(cookie_string):
+    cookies = {}
+    if not cookie_string:
+        return cookies
+    for cookie in cookie_string.split(';'):
+        cookie = cookie.strip()
+        if '=' in cookie:
+            key, value = cookie.split('=', 1)
+            cookies[key.strip()] = value.strip()
+    return cookies
+
+
+def check_token_expiry(cookies):
+    try:
+        auth_token = cookies.get(AUTH_COOKIE, "")
+        if not auth_token:
+            return None
+        if auth_token.startswith("base64-"):
+            auth_token = auth_token.replace("base64-", "").strip()
+        cookie_data = json.loads(base64.b64decode(auth_token))
+        return jwt_hours_left(cookie_data.get("access_token", ""))
+    except Exception:
+        pass
+    return None
+
+
+def is_media_response(response):
+    content_length = response.headers.get("content-length")
+    if content_length and int(content_length) < 100:
+        return False
+    content_type = response.headers.get("content-type", "").lower()
+    return not content_type or any(ct in content_type for ct in ["video", "image", "gif", "octet-stream", "binary"])
+
+
+class FramesetSource(Source):
+    """
+    Frameset search. Assets live on a CDN under guessed extensions, so each
+    item becomes one Attempt per candidate extension, ordered by what the
+    ExtensionProbe has learned.
+    """
+
+    name = "frameset"
+    label = "media files"
+    default_folder = "frameset_downloads"
+    credential_option = "cookie_string"
+    credentials_env = "FRAMESET_COOKIE_STRINGS"
+    asset_extensions = tuple(ext for _, extensions, _ in MEDIA_VARIANTS.values() for ext in extensions)
+
+    def __init__(self, output_folder=None, target_count=2000, cookie_string=None,
+                 download_workers=8, metadata_workers=4, page_size=400, use_http2=True,
+                 http2_connections=4, **kwargs):
+        super().__init__(output_folder, target_count, download_workers=download_workers,
+                         metadata_workers=metadata_workers, **kwargs)
+        if cookie_string is None:
+            cookie_string = os.getenv("FRAMESET_COOKIE_STRING", "")
+        self.cookie_string = cookie_string
+        self.cookies = parse_cookies(cookie_string)
+        self.page_size = page_size
+        self.use_http2 = use_http2
+        self.ext_probe = ExtensionProbe(self.output_folder / "_probe_stats.json")
+
+        # Page and CDN requests go through the shared adaptive controller. One
+        # pooled session keeps connections (and TLS sessions) alive across
+        # pages and items. Over h2 httpx multiplexes a host's streams on one
+        # connection, so the CDN pool cap only matters when a host falls back
+        # to HTTP/1.1: size it so every download worker still gets its own.
+        self.session = build_session(pool_size=download_workers, pool_hosts=4, controller=default_controller)
+        if use_http2 and httpx is not None:
+            self.cdn_session = Http2Session(max_connections=max(http2_connections, download_workers),
+                                            controller=default_controller)
+        else:
+            self.cdn_session = self.session
+
+    def check_auth(self):
+        if not self.cookie_string:
+            self.log.error("FRAMESET_COOKIE_STRING is not set!")
+            self.log.error("Get cookies from https://frameset.app (DevTools -> Network -> Copy all cookies)")
+            self.log.error("Set: export FRAMESET_COOKIE_STRING='cookie1=value1; cookie2=value2; ...'")
+            return False
+        if not self.cookies:
+            self.log.error("Failed to parse cookies. Check your cookie string format.")
+            return False
+
+        hours_left = check_token_expiry(self.cookies)
+        if hours_left is not None:
+            if hours_left <= 0:
+                self.log.error("Token expired. Get a new cookie from https://frameset.app")
+                return False
+            self.log.info(f"Token expires in {hours_left:.1f} hours")
+
+        if self.use_http2 and httpx is None:
+            self.log.warning("httpx[http2] is not installed; CDN downloads use pooled HTTP/1.1")
+        return True
+
+    def fetch_page(self, page):
+        url = f"{SEARCH_URL}?page={page}&size={self.page_size}"
+        try:
+            response = self.session.get(url, headers=HEADERS, cookies=self.cookies, timeout=30)
+            if response.status_code != 200:
+                self.log.error(f"Page {page}: Error {response.status_code}")
+                return None
+            data = response.json()
+            if isinstance(data, dict) and data.get("success"):
+                data_obj = data.get("data", {})
+                if isinstance(data_obj, dict):
+                    items = data_obj.get("results", [])
+                    if isinstance(items, list):
+                        for item in items:
+                            # Some results only carry "_id"; the store and index key on "id"
+                            if not item.get("id") and item.get("_id"):
+                                item["id"] = item["_id"]
+                        return items
+            return []
+        except Exception as e:
+            self.log.error(f"Page {page}: {e}")
+            return None
+
+    def is_downloadable(self, item):
+        return item.get("type") in MEDIA_VARIANTS
+
+    def attempts(self, item, item_id):
+        item_type = item.get("type", "motion")
+        suffix, extensions, asset_type = MEDIA_VARIANTS.get(item_type, MEDIA_VARIANTS["motion"])
+        # Learned order: the extension this item type usually resolves to goes first
+        return [Attempt(f"{CDN_BASE}/{item_id}{suffix}.{ext}", self.asset_path(item_id, ext, asset_type))
+                for ext in self.ext_probe.candidates(item_type, extensions)]
+
+    def session_for(self, url):
+        return self.cdn_session
+
+    def download_options(self):
+        return {"accept": is_media_response, "headers": CDN_HEADERS, "cookies": self.cookies}
+
+    def record_result(self, item, tried, attempt):
+        item_type = item.get("type", "motion")
+        _, extensions, _ = MEDIA_VARIANTS.get(item_type, MEDIA_VARIANTS["motion"])
+        hit_ext = attempt.filename.rsplit(".", 1)[1] if attempt else None
+        self.ext_probe.record(item_type, extensions, tried, hit_ext)
+
+    def start_worker(self, partition):
+        # The coordinator's probe gets every result and saves the stats
+        self.ext_probe.state_path = None
+
+    def close(self):
+        if self.cdn_session is not self.session:
+            self.cdn_session.close()
+        self.ext_probe.save()
+        self.ext_probe.log_summary()
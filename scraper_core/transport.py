@@ -0,0 +1,178 @@
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraper_core.rate_control import default_controller, record_error, record_response
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+    httpx = None
+
+
+class AdaptiveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that routes every request through the RateController.
+
+    Streamed responses keep their concurrency slot until they are closed,
+    so the limit covers the body transfer and not just the headers.
+    """
+
+    def __init__(self, controller=None, *args, **kwargs):
+        self.controller = controller or default_controller
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        limiter = self.controller.limiter_for(request.url)
+        limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        except Exception:
+            record_error(limiter)
+            limiter.release()
+            raise
+
+        record_response(limiter, response.status_code, time.monotonic() - start,
+                        response.headers.get("Retry-After"), _retry_history(response))
+
+        if stream:
+            close = response.close
+            released = []
+
+            def close_and_release():
+                close()
+                if not released:
+                    released.append(True)
+                    limiter.release()
+
+            response.close = close_and_release
+        else:
+            limiter.release()
+        return response
+
+
+def _retry_history(response):
+    retries = getattr(response.raw, "retries", None)
+    return [h.status for h in getattr(retries, "history", ()) if h.status]
+
+
+def build_session(headers=None, pool_size=10, pool_hosts=16, retries=None, controller=None):
+    """
+    Creates a requests Session on the adaptive adapter. pool_size should
+    match the number of workers sharing it, so no connection is thrown away
+    when the pool overflows.
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adapter = AdaptiveAdapter(
+        controller,
+        pool_connections=pool_hosts,
+        pool_maxsize=pool_size,
+        max_retries=retries if retries is not None else 0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_object_storage_url(url):
+    """
+    True for S3-style object storage URLs (S3 hosts or pre-signed URLs on any
+    host). These carry their own credentials and reject an API auth header.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host.endswith(".amazonaws.com") or host.startswith("s3.") or ".s3." in host or ".s3-" in host:
+        return True
+    return "x-amz-signature=" in parsed.query.lower()
+
+
+class Http2Session:
+    """
+    requests-style get() over one shared httpx client with HTTP/2 enabled.
+
+    Requests to the same origin are multiplexed as streams over a few
+    connections instead of one TLS connection per worker. Hosts that don't
+    negotiate h2 through ALPN transparently fall back to pooled HTTP/1.1.
+    Responses expose the subset of the requests API the scrapers use
+    (status_code, headers, iter_content, content, close, with-blocks).
+    """
+
+    def __init__(self, headers=None, max_connections=8, controller=None, verify=True):
+        if httpx is None:
+            raise RuntimeError("httpx[http2] is required for HTTP/2 (pip install 'httpx[http2]')")
+        self.controller = controller or default_controller
+        self.client = httpx.Client(
+            http2=True,
+            headers=headers,
+            follow_redirects=True,
+            verify=verify,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def get(self, url, headers=None, timeout=30, stream=False, cookies=None):
+        headers = dict(headers or {})
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+        limiter = self.controller.limiter_for(url)
+        limiter.acquire()
+        start = time.monotonic()
+        try:
+            request = self.client.build_request("GET", url, headers=headers, timeout=timeout)
+            response = self.client.send(request, stream=True)
+        except httpx.TransportError as e:
+            record_error(limiter)
+            limiter.release()
+            raise ConnectionError(str(e)) from e
+
+        record_response(limiter, response.status_code, time.monotonic() - start,
+                        response.headers.get("Retry-After"))
+        wrapped = Http2Response(response, limiter.release)
+        if not stream:
+            wrapped.content
+            wrapped.close()
+        return wrapped
+
+    def close(self):
+        self.client.close()
+
+
+class Http2Response:
+    def __init__(self, response, on_close):
+        self._response = response
+        self._on_close = on_close
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+
+    def iter_content(self, chunk_size=None):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TransportError as e:
+            # Surface as OSError, like requests does, so resume logic applies
+            raise ConnectionError(str(e)) from e
+
+    @property
+    def content(self):
+        try:
+            return self._response.read()
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+
+    def close(self):
+        if self._on_close:
+            self._response.close()
+            self._on_close()
+            self._on_close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
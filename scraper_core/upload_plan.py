@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+# Files the scrapers leave next to assets that are never uploaded
+_SKIP_PREFIXES = ("_", ".")
+_SKIP_SUFFIXES = (".part", ".seg", ".tmp")
+
+
+def _scan_dir(directory, prefix, suffixes, skip):
+    files = []
+    subdirs = []
+    with os.scandir(directory) as scanner:
+        for entry in scanner:
+            name = entry.name
+            if name.startswith(_SKIP_PREFIXES) or name.endswith(_SKIP_SUFFIXES):
+                continue
+            if entry.is_dir():
+                subdirs.append((entry.path, f"{prefix}{name}/"))
+            elif entry.is_file() and (not suffixes or name.endswith(suffixes)):
+                path = prefix + name
+                if path not in skip:
+                    st = entry.stat()
+                    files.append((path, st.st_size, st.st_mtime_ns))
+    return files, subdirs
+
+
+def scan_tree(root, suffixes=None, workers=8, skip=()):
+    """
+    Recursively lists root, scanning directories on a thread pool. Yields
+    (relative_path, size, mtime_ns) per file, in no particular order.
+    suffixes, when given, is a tuple of file name endings to keep; skip
+    holds relative paths to leave out (e.g. files already planned). Files
+    and directories are told apart from the listing alone, so only the
+    files yielded are stat'ed.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_dir, root, "", suffixes, skip)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for path, prefix in subdirs:
+                    pending.add(executor.submit(_scan_dir, path, prefix, suffixes, skip))
+                yield from files
+
+
+class PlannedManifest:
+    """
+    Record of files already written to an upload plan: one
+    "path<TAB>size<TAB>mtime_ns" line per file, path relative to the source
+    folder. A file is planned again only when it is new or its size or mtime
+    changed. Like the metadata store the file is append-only (later lines
+    win) and is rewritten once superseded lines make up half of it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._planned = None
+        self._lines = 0
+
+    def _load(self):
+        # path -> "size<TAB>mtime_ns\n", compared as text so loading and
+        # checking millions of entries stays cheap
+        if self._planned is None:
+            planned = {}
+            lines = 0
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        path, _, rest = line.partition("\t")
+                        planned[path] = rest
+                        lines += 1
+            self._planned = planned
+            self._lines = lines
+        return self._planned
+
+    def __len__(self):
+        return len(self._load())
+
+    def paths(self):
+        """The planned paths, for scan_tree(skip=...)."""
+        return self._load().keys()
+
+    def is_planned(self, path, size=None, mtime_ns=None):
+        return self._load().get(path) == _encode_stat(size, mtime_ns)
+
+    def filter_new(self, entries):
+        """
+        Yields the (path, size, mtime_ns) entries that are new or changed.
+        An entry without a size wasn't stat'ed and is new only if its path is.
+        """
+        planned = self._load()
+        for entry in entries:
+            path, size, mtime_ns = entry
+            stat = planned.get(path)
+            if stat is None or (size is not None and stat != _encode_stat(size, mtime_ns)):
+                yield entry
+
+    def record(self, entries):
+        """Appends (path, size, mtime_ns) entries with a single fsync'd write."""
+        planned = self._load()
+        rows = [(path, _encode_stat(size, mtime_ns)) for path, size, mtime_ns in entries
+                if "\t" not in path and "\n" not in path]
+        data = "".join(f"{path}\t{stat}" for path, stat in rows)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        planned.update(rows)
+        self._lines += len(rows)
+        if self._lines > 2 * len(planned):
+            self._compact()
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+        self._planned = {}
+        self._lines = 0
+
+    def _compact(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for path, stat in self._planned.items():
+                f.write(f"{path}\t{stat}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._planned)
+
+
+def _encode_stat(size, mtime_ns):
+    return f"{'' if size is None else size}\t{'' if mtime_ns is None else mtime_ns}\n"
+
+
+class PlanWriter:
+    """
+    Writes s5cmd commands round-robin across `parts` plan files so each can
+    be handed to its own `s5cmd run` worker. With parts=1 the plan goes to
+    output unchanged; otherwise to output's stem plus .000, .001, ...
+    """
+
+    def __init__(self, output, parts=1):
+        output = Path(output)
+        if parts <= 1:
+            self.paths = [output]
+        else:
+            width = len(str(parts - 1))
+            self.paths = [output.with_name(f"{output.stem}.{i:0{width}d}{output.suffix}") for i in range(parts)]
+        self._files = [open(path, "w", buffering=1024 * 1024) for path in self.paths]
+        self.count = 0
+
+    def write(self, line):
+        self._files[self.count % len(self._files)].write(line)
+        self.count += 1
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
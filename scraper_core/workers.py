@@ -0,0 +1,397 @@
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable
+
+from scraper_core.engine import Engine, _SourceLogger
+from scraper_core.metrics import default_metrics
+from scraper_core.pipeline import ItemQueue, start_producer
+from scraper_core.rate_control import HOST_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Multi-process downloads. At high concurrency one process spends a core on
+# TLS and decompression under the GIL, so a Coordinator crawls metadata as
+# usual (store, id index, incremental state) and hands each item to one of N
+# worker processes, picked by a stable hash of its id. Every worker builds
+# its own Source, and with it its own pooled sessions, rate controller and
+# credential, and writes to its own sink partition. Workers report each
+# download back, and every request, retry and connection error their rate
+# control and download engines record; the coordinator alone writes the id
+# index and keeps the metrics, so progress reports, /metrics and the run
+# summary cover all of them. An item goes to exactly one worker and is only sent when the index
+# doesn't have it, so no two processes (or tokens) fetch the same asset.
+# Workers are spawned, not forked, since the coordinator runs threads.
+# -----------------------------------------------------------------------------
+
+# Seconds between a worker's progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+def partition_of(item_id, partitions):
+    """The worker an item goes to: stable across runs and processes, unlike hash()."""
+    return zlib.crc32(str(item_id).encode("utf-8")) % partitions
+
+
+@dataclass
+class WorkerSpec:
+    """
+    How each worker process rebuilds the Source: source_cls(**options) plus
+    its sink and credential. sink is called with the worker's partition
+    number (see sinks.build_partition_sink), or None for the source's
+    default sink. credentials are handed out round-robin, one per worker,
+    through source_cls.credential_option. Workers start from host_limits,
+    the rate-control tuning as it was when the spec was made. Everything
+    must pickle.
+    """
+
+    source_cls: type
+    options: dict
+    processes: int
+    credentials: list = field(default_factory=list)
+    sink: Callable = None
+    host_limits: dict = field(default_factory=lambda: dict(HOST_LIMITS))
+
+    def credential(self, partition):
+        return self.credentials[partition % len(self.credentials)] if self.credentials else None
+
+    def build(self, partition):
+        options = dict(self.options)
+        if self.sink is not None:
+            options["sink"] = self.sink(partition)
+        credential = self.credential(partition)
+        if credential is not None:
+            options[self.source_cls.credential_option] = credential
+        source = self.source_cls(**options)
+        source.log = _SourceLogger(logger, {"source": f"{source.name} w{partition}"})
+        return source
+
+
+def build_source(source_cls, processes=1, credentials=(), sink=None, partition_sink=None, **options):
+    """
+    source_cls(**options) writing to sink, or with processes > 1 a
+    Coordinator over it whose workers write to partition_sink(partition)
+    (None: the source's default sink). The source gets the first of
+    credentials, when there are any, and the workers take them in turn.
+    """
+    if credentials:
+        options[source_cls.credential_option] = credentials[0]
+    source = source_cls(sink=sink, **options)
+    if processes <= 1:
+        return source
+    return Coordinator(source, WorkerSpec(source_cls, options, processes, list(credentials), partition_sink))
+
+
+class _Worker:
+    def __init__(self, partition, process, tasks):
+        self.partition = partition
+        self.process = process
+        self.tasks = tasks
+        self.ready = threading.Event()
+        self.ok = False
+        self.lost = False
+        self.gauges = {}
+        self.stats = None
+
+
+class Coordinator(Engine):
+    """
+    Engine that fetches metadata in this process and downloads in
+    spec.processes worker processes (see above). source is the
+    coordinator's own Source, used for the crawl and for record_result().
+    Per-host limits and download workers apply per process.
+    """
+
+    def __init__(self, source, spec):
+        super().__init__(source)
+        self.spec = spec
+        self.workers = []
+        self._context = multiprocessing.get_context("spawn")
+        self._events = None
+        self._pump = None
+        self._logs = None
+
+    def run(self):
+        credentials = len(self.spec.credentials)
+        if credentials > self.spec.processes:
+            self.log.warning(f"{credentials} credentials for {self.spec.processes} processes; "
+                             f"{credentials - self.spec.processes} stay unused")
+        self._start_workers()
+        try:
+            if not self._wait_ready():
+                return None
+            result = super().run()
+            if result is not None:
+                result["workers"] = {worker.partition: worker.stats for worker in self.workers}
+            return result
+        finally:
+            self._stop_workers()
+
+    def _start_workers(self):
+        log_queue = self._context.Queue()
+        self._logs = logging.handlers.QueueListener(log_queue, _LogRelay())
+        self._logs.start()
+        self._events = self._context.Queue()
+        self._pump = threading.Thread(target=self._pump_events, name="worker-events", daemon=True)
+        self._pump.start()
+        # The coordinator's queue bound, split between the workers
+        backlog = max(1, self.source.queue_size // self.spec.processes)
+        level = logging.getLogger().getEffectiveLevel()
+        for partition in range(self.spec.processes):
+            tasks = self._context.Queue(backlog)
+            process = self._context.Process(target=_work, name=f"{self.source.name}-w{partition}", daemon=True,
+                                            args=(self.spec, partition, tasks, self._events, log_queue, level))
+            self.workers.append(_Worker(partition, process, tasks))
+        for worker in self.workers:
+            worker.process.start()
+        self.log.info(f"Started {self.spec.processes} download processes")
+
+    def _wait_ready(self):
+        ok = True
+        for worker in self.workers:
+            while not worker.ready.wait(0.5):
+                if not worker.process.is_alive():
+                    break
+            if not worker.ok:
+                self.log.error(f"Worker {worker.partition} could not start; stopping the run")
+                ok = False
+        return ok
+
+    def _stop_workers(self):
+        for worker in self.workers:
+            if worker.process.is_alive():
+                self._send(worker, None)
+        for worker in self.workers:
+            worker.process.join(timeout=30)
+            if worker.process.is_alive():
+                self.log.warning(f"Worker {worker.partition} did not stop; terminating it")
+                worker.process.terminate()
+                worker.process.join()
+            worker.tasks.cancel_join_thread()
+        self._drain_events()
+        if self._logs is not None:
+            self._logs.stop()
+            self._logs = None
+
+    def _drain_events(self):
+        # Workers that exited have flushed their events, so this sees them all
+        if self._pump is not None:
+            self._events.put(None)
+            self._pump.join()
+            self._pump = None
+
+    def _send(self, worker, task):
+        # Blocks while the worker's backlog is full; a worker that died
+        # gets nothing more, and its items stay queued for the next run
+        while not worker.lost:
+            try:
+                worker.tasks.put(task, timeout=1)
+                return
+            except queue.Full:
+                if not worker.process.is_alive():
+                    worker.lost = True
+                    worker.gauges = {}
+                    self.log.error(f"Worker {worker.partition} exited (code {worker.process.exitcode}); "
+                                   f"its downloads resume on the next run")
+
+    def _pump_events(self):
+        source = self.source
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            kind, partition, *args = event
+            worker = self.workers[partition]
+            try:
+                if kind == "downloaded":
+                    self.mark_downloaded(*args)
+                    self._count("downloaded")
+                elif kind == "bytes":
+                    self.metrics.record_download(source.name, args[0])
+                elif kind == "failed":
+                    self._count("failed")
+                    self.metrics.record_failure(source.name)
+                elif kind == "result":
+                    source.record_result(*args)
+                elif kind == "request":
+                    self.metrics.record_request(*args)
+                elif kind == "retry":
+                    self.metrics.record_retry(*args)
+                elif kind == "error":
+                    self.metrics.record_error(*args)
+                elif kind == "progress":
+                    worker.gauges = args[0]
+                elif kind == "ready":
+                    worker.ok = args[0]
+                    worker.ready.set()
+                elif kind == "finished":
+                    worker.stats = args[0]
+            except Exception as e:
+                self.log.error(f"Worker {partition} {kind} event failed: {e}")
+
+    def download(self, downloads):
+        source = self.source
+        for worker in self.workers:
+            for name in ("queue_depth", "active_downloads"):
+                self.metrics.gauge(name, _worker_gauge(worker, name), source=source.name, worker=worker.partition)
+        self.log.info(f"Streaming downloads to {len(self.workers)} processes...")
+        for index, item in downloads:
+            item_id = source.item_id(item) or f"unknown_{index}"
+            if self.is_downloaded(item_id) or self._stored_before(item, item_id):
+                continue
+            self._send(self.workers[partition_of(item_id, len(self.workers))], item)
+        for worker in self.workers:
+            self._send(worker, None)
+        for worker in self.workers:
+            worker.process.join()
+            if worker.process.exitcode:
+                worker.gauges = {}
+                self.log.error(f"Worker {worker.partition} failed (code {worker.process.exitcode}); "
+                               f"its unfinished downloads resume on the next run")
+        # Record every reported download before run() closes the index
+        self._drain_events()
+
+    def _stored_before(self, item, item_id):
+        # Workers don't know which items were resumed, so the coordinator
+        # looks those up in the sink (shared by workers, see build_source)
+        if item_id not in self._resumed:
+            return False
+        try:
+            return self.already_stored(item_id, self.source.attempts(item, item_id))
+        except Exception as e:
+            self.log.warning(f"Could not check whether {item_id} is already stored: {e}")
+            return False
+
+
+def _worker_gauge(worker, name):
+    return lambda: worker.gauges.get(name, 0)
+
+
+class _LogRelay(logging.Handler):
+    """Hands worker log records to the coordinator's loggers."""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+class _EventMetrics:
+    """
+    The Metrics calls an Engine makes while downloading, sent to the
+    coordinator. Gauges are read here and go out with progress reports.
+    """
+
+    def __init__(self, events, partition):
+        self.events = events
+        self.partition = partition
+        self._gauges = {}
+
+    def record_download(self, source, size):
+        self.events.put(("bytes", self.partition, size))
+
+    def record_failure(self, source):
+        self.events.put(("failed", self.partition))
+
+    def gauge(self, name, fn, **labels):
+        self._gauges[name] = fn
+
+    def drop_gauges(self, **labels):
+        self._gauges.clear()
+
+    def gauge_values(self):
+        return {name: fn() for name, fn in list(self._gauges.items())}
+
+
+def _relay_hosts(metrics, events, partition):
+    """
+    Has metrics (the worker's default_metrics, which rate control and the
+    download engines record per-host traffic on) also send each request,
+    retry and error to the coordinator.
+    """
+    for kind in ("request", "retry", "error"):
+        setattr(metrics, f"record_{kind}", _relay(getattr(metrics, f"record_{kind}"), events, partition, kind))
+
+
+def _relay(record, events, partition, kind):
+    def relayed(*args):
+        record(*args)
+        events.put((kind, partition, *args))
+    return relayed
+
+
+class _WorkerEngine(Engine):
+    """Downloads the items the coordinator sends and reports back what happened to each."""
+
+    def __init__(self, source, partition, events):
+        super().__init__(source)
+        self.partition = partition
+        self.events = events
+        self.metrics = _EventMetrics(events, partition)
+
+    def is_downloaded(self, item_id):
+        # The coordinator only sends items its index doesn't have
+        return False
+
+    def mark_downloaded(self, item_id, filename):
+        self.events.put(("downloaded", self.partition, item_id, filename))
+
+    def record_result(self, item, tried, attempt):
+        super().record_result(item, tried, attempt)
+        self.events.put(("result", self.partition, item, tried, attempt))
+
+    def run_partition(self, tasks):
+        source = self.source
+        downloads = ItemQueue(source.queue_size)
+        self.metrics.gauge("queue_depth", downloads.qsize)
+
+        def receive():
+            for item in iter(tasks.get, None):
+                downloads.put(item)
+
+        stop = threading.Event()
+
+        def report():
+            while not stop.wait(PROGRESS_INTERVAL):
+                self.events.put(("progress", self.partition, self.metrics.gauge_values()))
+
+        receiver = start_producer(downloads, receive)
+        reporter = threading.Thread(target=report, name="worker-progress", daemon=True)
+        reporter.start()
+        try:
+            self.download(downloads)
+            receiver.join()
+        finally:
+            stop.set()
+            reporter.join()
+            self.events.put(("progress", self.partition, {}))
+            source.close()
+            source.sink.close()
+        self.stats["queued"] = downloads.queued
+        self.stats["hosts"] = default_metrics.snapshot()["hosts"]
+        return self.stats
+
+
+def _work(spec, partition, tasks, events, log_queue, level):
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    HOST_LIMITS.update(spec.host_limits)
+    _relay_hosts(default_metrics, events, partition)
+    try:
+        source = spec.build(partition)
+        ok = source.check_auth()
+        if ok:
+            source.start_worker(partition)
+    except Exception as e:
+        logger.error(f"Worker {partition} could not start: {e}")
+        events.put(("ready", partition, False))
+        return
+    events.put(("ready", partition, ok))
+    if not ok:
+        return
+    stats = _WorkerEngine(source, partition, events).run_partition(tasks)
+    events.put(("finished", partition, stats))